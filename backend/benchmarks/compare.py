@@ -0,0 +1,42 @@
+"""Compare two load_test.py result files.
+
+    python -m benchmarks.compare results/before.json results/after.json
+"""
+import argparse
+import json
+
+FIELDS = ("throughput_per_s", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _rows(result: dict):
+    for kind, summary in result["broadcast"].items():
+        yield f"broadcast {kind}", summary
+    yield "execute", result["execute"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    if before["config"] != after["config"]:
+        print("Warning: runs used different configurations")
+    print(f"{before['revision']} -> {after['revision']}")
+    after_rows = dict(_rows(after))
+    for name, old in _rows(before):
+        new = after_rows.get(name)
+        if new is None:
+            continue
+        print(name)
+        for field in FIELDS:
+            change = (new[field] - old[field]) / old[field] * 100 if old[field] else 0.0
+            print(f"  {field:>17}: {old[field]:10.2f} -> {new[field]:10.2f}  ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Load test: N rooms x M WebSocket clients typing and chatting, plus bursts of execute calls.
+
+    python -m benchmarks.load_test --rooms 20 --clients 5 --duration 30
+
+Run from the backend directory. By default a server backed by the in-memory
+stand-ins (benchmarks/standins.py) is started on a free port, so results
+reflect the app rather than Atlas or Firebase; pass --url to target a running
+server instead (tokens are then sent as-is, so that server must accept them).
+
+Every frame a client sends carries a bench_ts timestamp from this process's
+monotonic clock; latency is measured when another client in the room receives
+it. Results go to --output-dir as JSON, named by time and git revision, and two
+runs can be compared with benchmarks/compare.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import httpx
+from websockets.asyncio.client import connect
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Execute payloads by language; each is small enough that latency is dominated by process startup
+EXECUTE_SNIPPETS = {
+    "python": "print(sum(range(1000)))",
+    "cpp": "#include <iostream>\nint main() { long s = 0; for (int i = 0; i < 1000; ++i) s += i; std::cout << s; }",
+    "c": "#include <stdio.h>\nint main(void) { long s = 0; for (int i = 0; i < 1000; ++i) s += i; printf(\"%ld\", s); }",
+    "javascript": "let s = 0; for (let i = 0; i < 1000; i++) s += i; console.log(s);",
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of unsorted samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples: List[float], duration: float) -> dict:
+    """Latency summary in milliseconds plus throughput per second."""
+    ms = [s * 1000 for s in samples]
+    return {
+        "count": len(ms),
+        "throughput_per_s": len(ms) / duration if duration else 0.0,
+        "mean_ms": sum(ms) / len(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms) if ms else 0.0,
+    }
+
+
+class Stats:
+    def __init__(self):
+        self.sent: Dict[str, int] = {"code_update": 0, "chat_message": 0}
+        self.latency: Dict[str, List[float]] = {"code_update": [], "chat_message": []}
+        self.execute: List[float] = []
+        self.execute_errors = 0
+        self.socket_errors = 0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def _wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{base_url}/api/languages")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not come up within {timeout}s")
+
+
+async def _create_rooms(http: httpx.AsyncClient, count: int, language: str) -> List[dict]:
+    rooms = []
+    for i in range(count):
+        owner = f"bench-owner-{i}"
+        response = await http.post(
+            "/api/rooms", json={"name": f"bench-{i}", "language": language},
+            headers={"Authorization": f"Bearer {owner}"}
+        )
+        response.raise_for_status()
+        rooms.append({"id": response.json()["room_id"], "owner": owner})
+    return rooms
+
+
+async def _client(ws_url: str, room: dict, client_id: str, args, stats: Stats, start: asyncio.Event, stop: asyncio.Event):
+    try:
+        async with connect(f"{ws_url}/ws/{room['id']}", max_size=None) as ws:
+            await ws.send(json.dumps({"type": "auth", "user_uid": room["owner"]}))
+            await ws.recv()  # initial chat_history
+
+            async def receive():
+                async for raw in ws:
+                    received = time.perf_counter()
+                    message = json.loads(raw)
+                    kind = message.get("type")
+                    if kind in stats.latency and message.get("bench_client") not in (None, client_id):
+                        stats.latency[kind].append(received - message["bench_ts"])
+
+            receiver = asyncio.create_task(receive())
+            await start.wait()
+            code = ""
+            next_chat = time.perf_counter() + random.expovariate(args.chat_rate) if args.chat_rate else float("inf")
+            while not stop.is_set():
+                # Typing: one code_update per keystroke, jittered around the typing rate
+                await asyncio.sleep(random.expovariate(args.typing_rate))
+                code += random.choice("abcdefghij \n")
+                await ws.send(json.dumps({
+                    "type": "code_update", "code": code, "bench_client": client_id, "bench_ts": time.perf_counter()
+                }))
+                stats.sent["code_update"] += 1
+                if time.perf_counter() >= next_chat:
+                    await ws.send(json.dumps({
+                        "type": "chat_message", "user": client_id, "text": "hello from the load test",
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                        "bench_client": client_id, "bench_ts": time.perf_counter()
+                    }))
+                    stats.sent["chat_message"] += 1
+                    next_chat = time.perf_counter() + random.expovariate(args.chat_rate)
+            await asyncio.sleep(args.drain)
+            receiver.cancel()
+    except Exception as e:
+        stats.socket_errors += 1
+        print(f"client {client_id}: {e!r}", file=sys.stderr)
+
+
+async def _execute_bursts(http: httpx.AsyncClient, rooms: List[dict], args, stats: Stats, stop: asyncio.Event):
+    code = EXECUTE_SNIPPETS[args.language]
+
+    async def one(room: dict):
+        started = time.perf_counter()
+        try:
+            response = await http.post(
+                f"/api/rooms/{room['id']}/execute", json={"code": code},
+                headers={"Authorization": f"Bearer {room['owner']}"}, timeout=120
+            )
+            result = response.json()
+            if response.status_code != 200 or result.get("returncode") != 0:
+                stats.execute_errors += 1
+                return
+        except httpx.HTTPError:
+            stats.execute_errors += 1
+            return
+        stats.execute.append(time.perf_counter() - started)
+
+    while not stop.is_set():
+        await asyncio.gather(*(one(random.choice(rooms)) for _ in range(args.exec_burst)))
+        try:
+            await asyncio.wait_for(stop.wait(), args.exec_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args) -> dict:
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = _free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.serve", "--port", str(port)], cwd=BACKEND_DIR
+        )
+    try:
+        await _wait_ready(base_url)
+        ws_url = base_url.replace("http", "ws", 1)
+        stats = Stats()
+        start, stop = asyncio.Event(), asyncio.Event()
+        limits = httpx.Limits(max_connections=max(args.exec_burst, 10))
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as http:
+            rooms = await _create_rooms(http, args.rooms, args.language)
+            clients = [
+                asyncio.create_task(_client(ws_url, room, f"r{r}c{c}", args, stats, start, stop))
+                for r, room in enumerate(rooms) for c in range(args.clients)
+            ]
+            await asyncio.sleep(1)  # let every client connect before the clock starts
+            start.set()
+            started = time.perf_counter()
+            bursts = asyncio.create_task(_execute_bursts(http, rooms, args, stats, stop)) if args.exec_burst else None
+            await asyncio.sleep(args.duration)
+            stop.set()
+            elapsed = time.perf_counter() - started
+            await asyncio.gather(*clients, *([bursts] if bursts else []))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "server": "standins" if args.url is None else args.url,
+        },
+        "config": {
+            "rooms": args.rooms, "clients_per_room": args.clients, "duration_s": args.duration,
+            "typing_rate": args.typing_rate, "chat_rate": args.chat_rate, "language": args.language,
+            "exec_burst": args.exec_burst, "exec_interval_s": args.exec_interval, "seed": args.seed,
+        },
+        "sent": {kind: {"count": n, "per_s": n / elapsed} for kind, n in stats.sent.items()},
+        "broadcast": {kind: summarize(samples, elapsed) for kind, samples in stats.latency.items()},
+        "execute": {**summarize(stats.execute, elapsed), "errors": stats.execute_errors},
+        "socket_errors": stats.socket_errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=10, help="Rooms to create")
+    parser.add_argument("--clients", type=int, default=5, help="WebSocket clients per room")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--typing-rate", type=float, default=5, help="Keystrokes per second per client")
+    parser.add_argument("--chat-rate", type=float, default=0.2, help="Chat messages per second per client (0 disables)")
+    parser.add_argument("--exec-burst", type=int, default=5, help="Concurrent execute calls per burst (0 disables)")
+    parser.add_argument("--exec-interval", type=float, default=5, help="Seconds between execute bursts")
+    parser.add_argument("--language", default="python", choices=sorted(EXECUTE_SNIPPETS))
+    parser.add_argument("--drain", type=float, default=1, help="Seconds to keep receiving after the run ends")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="Target a running server instead of starting one with stand-ins")
+    parser.add_argument("--output-dir", default=os.path.join(BACKEND_DIR, "benchmarks", "results"))
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    result = asyncio.run(run(args))
+    os.makedirs(args.output_dir, exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['revision']}.json"
+    path = os.path.join(args.output_dir, name)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+    for kind, summary in result["broadcast"].items():
+        print(f"{kind:>13}: {summary['throughput_per_s']:8.1f} deliveries/s  "
+              f"p50 {summary['p50_ms']:.2f}ms  p95 {summary['p95_ms']:.2f}ms  p99 {summary['p99_ms']:.2f}ms")
+    ex = result["execute"]
+    print(f"{'execute':>13}: {ex['count']} ok, {ex['errors']} failed  "
+          f"p50 {ex['p50_ms']:.1f}ms  p95 {ex['p95_ms']:.1f}ms  p99 {ex['p99_ms']:.1f}ms")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Run the backend against the in-memory stand-ins for benchmarking.
+
+    python -m benchmarks.serve --port 8765
+
+Run from the backend directory. load_test.py starts this itself unless --url is given.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import standins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    standins.install()
+    import uvicorn
+    from src.main import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
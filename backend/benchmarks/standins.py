@@ -0,0 +1,330 @@
+"""Local stand-ins for MongoDB and Firebase Auth used by the benchmark server.
+
+InMemoryDatabase implements the subset of Motor's collection API the app uses,
+so benchmarks measure the app itself rather than network round trips to Atlas
+or Google. Tokens are accepted as-is: the bearer token is the user's uid.
+"""
+import copy
+import re
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+
+def _get(doc: dict, path: str):
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key != "_id":
+                yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def text_score(doc: dict, search: str) -> float:
+    """A rough $text score: how often the search's words occur in the document's strings."""
+    terms = {word.lower() for word in _WORD.findall(re.sub(r"(?:^|\s)-\S+", " ", search))}
+    return float(sum(word.lower() in terms for text in _strings(doc) for word in _WORD.findall(text)))
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$in":
+        if isinstance(value, list):
+            return any(v in operand for v in value)
+        return value in operand
+    if op == "$nin":
+        return not _compare(value, "$in", operand)
+    if op == "$ne":
+        return value != operand
+    if op == "$exists":
+        return (value is not None) == bool(operand)
+    if value is None:
+        return False
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    raise NotImplementedError(f"Unsupported query operator {op}")
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == "$text":
+            if not text_score(doc, condition["$search"]):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, dict) and "$regex" in condition:
+            flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+            if not isinstance(value, str) or not re.search(condition["$regex"], value, flags):
+                return False
+            continue
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif isinstance(value, list) and not isinstance(condition, list):
+            if condition not in value:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False):
+    for op, fields in update.items():
+        for key, value in fields.items():
+            if op == "$set":
+                doc[key] = copy.deepcopy(value)
+            elif op == "$setOnInsert":
+                if inserting:
+                    doc[key] = copy.deepcopy(value)
+            elif op == "$unset":
+                doc.pop(key, None)
+            elif op == "$inc":
+                doc[key] = doc.get(key, 0) + value
+            elif op == "$max":
+                doc[key] = value if key not in doc or doc[key] is None else max(doc[key], value)
+            elif op == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                doc.setdefault(key, []).extend(copy.deepcopy(items))
+            elif op == "$addToSet":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                target = doc.setdefault(key, [])
+                target.extend(item for item in items if item not in target)
+            elif op == "$pull":
+                if isinstance(value, dict) and "$in" in value:
+                    doc[key] = [item for item in doc.get(key, []) if item not in value["$in"]]
+                else:
+                    doc[key] = [item for item in doc.get(key, []) if item != value]
+            else:
+                raise NotImplementedError(f"Unsupported update operator {op}")
+
+
+def _project(doc: dict, projection: Optional[dict], search: Optional[str] = None) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    meta = {k: text_score(doc, search) for k, v in projection.items() if v == {"$meta": "textScore"}}
+    included = {k for k, v in projection.items() if v and not isinstance(v, dict)}
+    if included:
+        return {**{k: v for k, v in doc.items() if k in included or k == "_id"}, **meta}
+    return {**{k: v for k, v in doc.items() if projection.get(k, 1)}, **meta}
+
+
+class _Result:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class InMemoryCursor:
+    def __init__(self, docs: List[dict], projection: Optional[dict], search: Optional[str] = None):
+        self._docs = docs
+        self._projection = projection
+        self._search = search  # the $text search, for textScore sorting and projection
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction=1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            if order == {"$meta": "textScore"}:
+                self._docs.sort(key=lambda d: text_score(d, self._search), reverse=True)
+                continue
+            self._docs.sort(key=lambda d: (_get(d, field) is not None, _get(d, field)), reverse=order < 0)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _selected(self):
+        docs = self._docs[self._skip:]
+        return docs[:self._limit] if self._limit else docs
+
+    def __aiter__(self):
+        self._iter = iter(self._selected())
+        return self
+
+    async def __anext__(self):
+        try:
+            return _project(next(self._iter), self._projection, self._search)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        docs = [_project(d, self._projection, self._search) for d in self._selected()]
+        return docs[:length] if length else docs
+
+
+class InMemoryCollection:
+    def __init__(self):
+        self.docs: List[dict] = []
+
+    def _find(self, query: dict) -> List[dict]:
+        return [doc for doc in self.docs if matches(doc, query or {})]
+
+    async def create_index(self, *args, **kwargs):
+        return None
+
+    async def find_one(self, query=None, projection=None, **kwargs):
+        found = self._find(query)
+        return _project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None, **kwargs):
+        search = (query or {}).get("$text", {}).get("$search")
+        return InMemoryCursor(self._find(query), projection, search)
+
+    async def count_documents(self, query, **kwargs):
+        return len(self._find(query))
+
+    async def insert_one(self, doc: dict):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(copy.deepcopy(doc))
+        return _Result(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs: List[dict], **kwargs):
+        ids = [(await self.insert_one(doc)).inserted_id for doc in docs]
+        return _Result(inserted_ids=ids)
+
+    def _upsert(self, query: dict, update: dict) -> dict:
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc.setdefault("_id", ObjectId())
+        apply_update(doc, update, inserting=True)
+        self.docs.append(doc)
+        return doc
+
+    async def update_one(self, query, update, upsert=False, **kwargs):
+        found = self._find(query)
+        if found:
+            apply_update(found[0], update)
+            return _Result(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            return _Result(matched_count=0, modified_count=0, upserted_id=self._upsert(query, update)["_id"])
+        return _Result(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query, update, upsert=False, **kwargs):
+        found = self._find(query)
+        for doc in found:
+            apply_update(doc, update)
+        if not found and upsert:
+            self._upsert(query, update)
+        return _Result(matched_count=len(found), modified_count=len(found))
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=ReturnDocument.BEFORE,
+                                  upsert=False, **kwargs):
+        found = self._find(query)
+        if not found:
+            if upsert:
+                doc = self._upsert(query, update)
+                return _project(doc, projection) if return_document == ReturnDocument.AFTER else None
+            return None
+        before = _project(found[0], projection)
+        apply_update(found[0], update)
+        return _project(found[0], projection) if return_document == ReturnDocument.AFTER else before
+
+    async def delete_one(self, query, **kwargs):
+        found = self._find(query)
+        if found:
+            self.docs.remove(found[0])
+        return _Result(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query, **kwargs):
+        found = self._find(query)
+        for doc in found:
+            self.docs.remove(doc)
+        return _Result(deleted_count=len(found))
+
+    async def bulk_write(self, operations, ordered=True, **kwargs):
+        for operation in operations:
+            name = type(operation).__name__
+            if name == "InsertOne":
+                await self.insert_one(operation._doc)
+            elif name == "UpdateOne":
+                await self.update_one(operation._filter, operation._doc, upsert=bool(operation._upsert))
+            elif name == "UpdateMany":
+                await self.update_many(operation._filter, operation._doc, upsert=bool(operation._upsert))
+            elif name == "DeleteOne":
+                await self.delete_one(operation._filter)
+            elif name == "DeleteMany":
+                await self.delete_many(operation._filter)
+            else:
+                raise NotImplementedError(f"Unsupported bulk operation {name}")
+        return _Result(acknowledged=True)
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection()
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, name, *args, **kwargs):
+        return {"ok": 1}
+
+
+class _FakeUser:
+    def __init__(self, uid: str, email: str = None):
+        self.uid = uid
+        self.email = email or f"{uid}@bench.local"
+        self.display_name = uid
+
+
+class _FakeGetUsersResult:
+    def __init__(self, identifiers):
+        self.users = [_FakeUser(identifier.email.split("@")[0], identifier.email) for identifier in identifiers]
+        self.not_found = []
+
+
+def install():
+    """Point the app at the stand-ins. Must run before src.main is imported."""
+    import src.core.firebase_admin as firebase
+    from firebase_admin import auth as firebase_auth
+    firebase.get_firebase_app = lambda: None  # no app, so no credentials are loaded
+    firebase_auth.verify_id_token = lambda token, *a, **kw: {"uid": token, "email": f"{token}@bench.local"}
+    firebase_auth.get_user = lambda uid, *a, **kw: _FakeUser(uid)
+    firebase_auth.get_user_by_email = lambda email, *a, **kw: _FakeUser(email.split("@")[0], email)
+    firebase_auth.get_users = lambda identifiers, *a, **kw: _FakeGetUsersResult(identifiers)
+
+    from src.db import mongodb
+    database = InMemoryDatabase()
+    mongodb.use_database(database)
+    return database
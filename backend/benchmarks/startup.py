@@ -0,0 +1,110 @@
+"""Startup benchmark: import cost of the app and worker boot-to-ready time.
+
+    python -m benchmarks.startup --repeats 10
+
+Run from the backend directory. Each repeat uses a fresh interpreter, so the
+numbers match what a new gunicorn worker pays. The app is imported for real
+(no stand-ins) so SDK import cost shows up; external clients must not need
+credentials to import. -X importtime output is aggregated per top-level
+package to show where import time goes. Results go to --output-dir as JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from benchmarks.load_test import BACKEND_DIR, _free_port, _git_revision, percentile
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure_import() -> dict:
+    """Import src.main in a fresh interpreter; returns wall time and self time per top-level package."""
+    code = "import time; t = time.perf_counter(); import src.main; print(time.perf_counter() - t)"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing src.main failed:\n{proc.stderr[-2000:]}")
+    packages = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, _, _, name = match.groups()
+            packages[name.split(".")[0]] += int(self_us) / 1000
+    return {"seconds": float(proc.stdout.strip().splitlines()[-1]), "packages_ms": packages}
+
+
+def measure_boot(timeout: float = 60) -> float:
+    """Seconds from spawning a uvicorn worker until it answers an HTTP request."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/api/languages", timeout=1).read()
+                return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f"Worker did not become ready within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _summary(samples) -> dict:
+    ms = [s * 1000 for s in samples]
+    return {"p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95), "mean_ms": statistics.fmean(ms)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="Packages to report by import time")
+    parser.add_argument("--output-dir", default=os.path.join(BACKEND_DIR, "benchmarks", "results"))
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.repeats)]
+    boots = [measure_boot() for _ in range(args.repeats)]
+    packages = defaultdict(list)
+    for run in imports:
+        for name, ms in run["packages_ms"].items():
+            packages[name].append(ms)
+    heaviest = sorted(((name, statistics.median(ms)) for name, ms in packages.items()), key=lambda p: -p[1])
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {"repeats": args.repeats},
+        "import": _summary([run["seconds"] for run in imports]),
+        "boot_to_ready": _summary(boots),
+        "import_by_package_ms": dict(heaviest[:args.top]),
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"startup-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{result['revision']}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"import src.main: p50 {result['import']['p50_ms']:.0f}ms  p95 {result['import']['p95_ms']:.0f}ms")
+    print(f"boot to ready:   p50 {result['boot_to_ready']['p50_ms']:.0f}ms  p95 {result['boot_to_ready']['p95_ms']:.0f}ms")
+    for name, ms in heaviest[:args.top]:
+        print(f"  {name:<24} {ms:7.1f}ms")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
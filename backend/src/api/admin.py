@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.core.firebase_auth import get_admin_user
+from src.services.profiler import profiler, ProfilerBusy
+
+router = APIRouter()
+
+
+@router.post("/api/admin/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=120),
+    all_threads: bool = Query(False),
+    user=Depends(get_admin_user)
+):
+    """Sample this worker's stacks for N seconds and return a collapsed-stack profile."""
+    try:
+        return await profiler.profile(seconds, all_threads=all_threads)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
@@ -0,0 +1,226 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+from bson import ObjectId, errors as bson_errors
+from fastapi import APIRouter, Depends, HTTPException
+from pymongo import UpdateOne
+
+from src.db.mongodb import db
+from src.models.room import BulkMembershipRequest, BulkDeleteRequest
+from src.services.websocket_manager import manager
+from src.services.activity_tracker import activity_tracker
+from src.services.room_files import room_files
+from src.services.room_registry import room_registry
+from src.services.room_router import room_router
+from src.core.firebase_admin import get_auth
+from src.core.firebase_auth import get_current_user
+from src.core.metrics import FIREBASE_CALL_DURATION
+from src.core.tracing import span
+
+router = APIRouter()
+
+# Firebase's get_users accepts at most 100 identifiers per call
+FIREBASE_LOOKUP_BATCH = 100
+
+
+async def _resolve_emails(emails: List[str]) -> Tuple[Dict[str, str], List[str], List[str]]:
+    """Look up UIDs for many emails in batched Firebase calls.
+
+    Returns ({email: uid}, [unknown emails], [malformed emails]).
+    """
+    firebase_auth = get_auth()
+    unique = list(dict.fromkeys(email.strip().lower() for email in emails if email.strip()))
+    identifiers = []
+    invalid = []
+    for email in unique:
+        try:
+            identifiers.append(firebase_auth.EmailIdentifier(email))
+        except ValueError:
+            invalid.append(email)
+    found: Dict[str, str] = {}
+    for i in range(0, len(identifiers), FIREBASE_LOOKUP_BATCH):
+        with span("resolve_emails"), FIREBASE_CALL_DURATION.time("get_users"):
+            result = await asyncio.to_thread(firebase_auth.get_users, identifiers[i:i + FIREBASE_LOOKUP_BATCH])
+        for user in result.users:
+            if user.email:
+                found[user.email.lower()] = user.uid
+    unknown = [email for email in unique if email not in found and email not in invalid]
+    return found, unknown, invalid
+
+
+async def _owned_rooms(room_ids: List[str], uid: str, results: List[dict]) -> Dict[str, dict]:
+    """Fetch the requested rooms in one query; rooms that are invalid, missing or not owned go to results."""
+    obj_ids = {}
+    for room_id in dict.fromkeys(room_ids):
+        try:
+            obj_ids[room_id] = ObjectId(room_id)
+        except bson_errors.InvalidId:
+            results.append({"room_id": room_id, "status": "invalid_room_id"})
+    found = {}
+    if obj_ids:
+        with span("load_rooms"):
+            cursor = db.rooms.find({"_id": {"$in": list(obj_ids.values())}}, {"name": 1, "owner": 1, "shared_with": 1})
+            async for room in cursor:
+                found[str(room["_id"])] = room
+    rooms = {}
+    for room_id in obj_ids:
+        room = found.get(room_id)
+        if room is None:
+            results.append({"room_id": room_id, "status": "room_not_found"})
+        elif room["owner"] != uid:
+            results.append({"room_id": room_id, "status": "forbidden"})
+        else:
+            rooms[room_id] = room
+    return rooms
+
+
+async def _targets(request: BulkMembershipRequest, results: List[dict]) -> List[Tuple[str, str]]:
+    """(label, uid) for every distinct requested user; malformed emails and emails with no account go to results."""
+    if not request.emails and not request.uids:
+        raise HTTPException(status_code=400, detail="No users given")
+    targets = []
+    if request.emails:
+        by_email, unknown, invalid = await _resolve_emails(request.emails)
+        targets.extend(by_email.items())
+        results.extend({"email": email, "status": "invalid_email"} for email in invalid)
+        results.extend({"email": email, "status": "user_not_found"} for email in unknown)
+    targets.extend((uid, uid) for uid in request.uids)
+    # A user given both by email and by UID is handled once
+    unique = {}
+    for label, uid in targets:
+        unique.setdefault(uid, label)
+    return [(label, uid) for uid, label in unique.items()]
+
+
+def _notify_grouped(per_user: Dict[str, List[dict]], subtype: str, describe):
+    """Send each user one notification covering all the rooms that changed for them."""
+    for uid, rooms in per_user.items():
+        manager.notify(uid, {
+            "type": "notification",
+            "subtype": subtype,
+            "room_id": rooms[0]["room_id"] if len(rooms) == 1 else None,
+            "room_ids": [room["room_id"] for room in rooms],
+            "rooms": rooms,
+            "message": describe(rooms),
+        })
+
+
+def _room_list(rooms: List[dict]) -> str:
+    names = ", ".join(f"'{room['room_name']}'" for room in rooms)
+    return f"the room {names}" if len(rooms) == 1 else f"{len(rooms)} rooms ({names})"
+
+
+def _summary(results: List[dict]) -> dict:
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
+
+
+@router.post("/api/rooms/bulk-share")
+async def bulk_share(request: BulkMembershipRequest, user=Depends(get_current_user)):
+    """Share many rooms with many users (by email and/or UID). Only rooms the caller owns are shared.
+
+    Emails are resolved in batched Firebase lookups, all rooms are updated in a
+    single bulk write, and each recipient gets one notification listing their
+    new rooms. The response reports a status per room/user pair.
+    """
+    results: List[dict] = []
+    rooms = await _owned_rooms(request.room_ids, user["uid"], results)
+    targets = await _targets(request, results)
+
+    additions: Dict[str, List[str]] = {}
+    per_user: Dict[str, List[dict]] = {}
+    for room_id, room in rooms.items():
+        members = set(room.get("shared_with", []))
+        for label, uid in targets:
+            item = {"room_id": room_id, "user": label, "uid": uid}
+            if uid == user["uid"]:
+                item["status"] = "self"
+            elif uid in members:
+                item["status"] = "already_shared"
+            else:
+                item["status"] = "shared"
+                members.add(uid)
+                additions.setdefault(room_id, []).append(uid)
+                per_user.setdefault(uid, []).append({"room_id": room_id, "room_name": room["name"]})
+            results.append(item)
+
+    if additions:
+        with span("bulk_write"):
+            await db.rooms.bulk_write([
+                UpdateOne({"_id": ObjectId(room_id)}, {"$addToSet": {"shared_with": {"$each": uids}}})
+                for room_id, uids in additions.items()
+            ], ordered=False)
+        for room_id, uids in additions.items():
+            for uid in uids:
+                room_registry.grant(room_id, uid)
+        await room_router.members_changed(additions)
+
+    _notify_grouped(
+        per_user, "room_shared",
+        lambda shared: f"{user['email']} shared {_room_list(shared)} with you"
+    )
+    return {"results": results, "summary": _summary(results)}
+
+
+@router.post("/api/rooms/bulk-remove")
+async def bulk_remove(request: BulkMembershipRequest, user=Depends(get_current_user)):
+    """Remove many users (by email and/or UID) from many rooms the caller owns, in a single bulk write."""
+    results: List[dict] = []
+    rooms = await _owned_rooms(request.room_ids, user["uid"], results)
+    targets = await _targets(request, results)
+
+    removals: Dict[str, List[str]] = {}
+    per_user: Dict[str, List[dict]] = {}
+    for room_id, room in rooms.items():
+        members = set(room.get("shared_with", []))
+        for label, uid in targets:
+            item = {"room_id": room_id, "user": label, "uid": uid}
+            if uid in members:
+                item["status"] = "removed"
+                members.discard(uid)
+                removals.setdefault(room_id, []).append(uid)
+                per_user.setdefault(uid, []).append({"room_id": room_id, "room_name": room["name"]})
+            else:
+                item["status"] = "not_a_member"
+            results.append(item)
+
+    if removals:
+        with span("bulk_write"):
+            await db.rooms.bulk_write([
+                UpdateOne({"_id": ObjectId(room_id)}, {"$pull": {"shared_with": {"$in": uids}}})
+                for room_id, uids in removals.items()
+            ], ordered=False)
+        for room_id, uids in removals.items():
+            for uid in uids:
+                room_registry.revoke(room_id, uid)
+        await room_router.members_changed(removals)
+
+    _notify_grouped(
+        per_user, "removed_from_room",
+        lambda removed: f"You have been removed from {_room_list(removed)} by the owner."
+    )
+    return {"results": results, "summary": _summary(results)}
+
+
+@router.post("/api/rooms/bulk-delete")
+async def bulk_delete(request: BulkDeleteRequest, user=Depends(get_current_user)):
+    """Delete many rooms the caller owns with a single delete_many."""
+    results: List[dict] = []
+    rooms = await _owned_rooms(request.room_ids, user["uid"], results)
+    if rooms:
+        # Owners drop their hot copies first, or their next write-back would recreate the rooms
+        unreachable = await room_router.discard(rooms)
+        results.extend({"room_id": room_id, "status": "owner_unreachable"} for room_id in unreachable)
+        rooms = {room_id: room for room_id, room in rooms.items() if room_id not in unreachable}
+    if rooms:
+        with span("delete_many"):
+            await db.rooms.delete_many(
+                {"_id": {"$in": [ObjectId(room_id) for room_id in rooms]}, "owner": user["uid"]}
+            )
+            await room_files.delete_rooms(rooms)
+        for room_id in rooms:
+            activity_tracker.forget(room_id)
+            results.append({"room_id": room_id, "status": "deleted"})
+    return {"results": results, "summary": _summary(results)}
@@ -0,0 +1,114 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from src.core.firebase_auth import get_current_user
+from src.core.tracing import span
+from src.models.room import FileWrite
+from src.services.activity_tracker import activity_tracker
+from src.services.diagnostics import diagnostics
+from src.services.room_files import room_files, normalize_path
+from src.services.room_registry import room_registry
+from src.services.websocket_manager import manager
+
+router = APIRouter()
+
+
+async def _room_for(room_id: str, user: dict):
+    with span("load_room"):
+        room = await room_registry.acquire(room_id)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    if not room.can_access(user["uid"]):
+        raise HTTPException(status_code=403, detail="Not authorized to access this room")
+    return room
+
+
+def _path(path: str) -> str:
+    normalized = normalize_path(path)
+    if not normalized:
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    return normalized
+
+
+async def _file_list(room) -> list:
+    """The entry file plus every stored or unsaved file, sorted by path."""
+    stored = {doc["path"]: doc for doc in await room_files.list(room.room_id)}
+    for path, file in room.files.items():
+        stored[path] = {**stored.get(path, {}), "path": path, "size": len(file["content"].encode()),
+                        "version": file["version"]}
+    stored.pop(room.entry_path, None)
+    entry = {"path": room.entry_path, "size": len(room.code.encode()), "version": room.version, "entry": True}
+    return [entry] + [{**doc, "entry": False} for _, doc in sorted(stored.items())]
+
+
+async def _announce_tree(room):
+    """Tell every socket in the room that files were added or removed (paths only, no contents)."""
+    files = [{"path": f["path"], "entry": f["entry"]} for f in await _file_list(room)]
+    await manager.broadcast_to_room(json.dumps({"type": "files_changed", "files": files}), room.room_id)
+
+
+@router.get("/api/rooms/{room_id}/files")
+async def list_files(room_id: str, user=Depends(get_current_user)):
+    """The room's file tree as a flat list of paths, without contents. The entry file comes first."""
+    room = await _room_for(room_id, user)
+    return {"entry": room.entry_path, "files": await _file_list(room)}
+
+
+@router.get("/api/rooms/{room_id}/files/{path:path}")
+async def read_file(room_id: str, path: str, user=Depends(get_current_user)):
+    room = await _room_for(room_id, user)
+    path = _path(path)
+    file = await room_registry.open_file(room, path)
+    if file is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return {"path": path, "content": file["content"], "version": file["version"]}
+
+
+@router.put("/api/rooms/{room_id}/files/{path:path}")
+async def write_file(room_id: str, path: str, file: FileWrite, user=Depends(get_current_user)):
+    """Create or overwrite a file. Writing the entry file's path updates the room's code."""
+    room = await _room_for(room_id, user)
+    path = _path(path)
+    if len(file.content.encode()) > room_files.max_file_bytes:
+        raise HTTPException(status_code=413, detail=f"Files are limited to {room_files.max_file_bytes} bytes")
+
+    if path == room.entry_path:
+        event = {"type": "code_update", "code": file.content}
+        version = room_registry.update_code(room, event)
+        activity_tracker.touch(room_id)
+        await manager.broadcast_to_file(json.dumps(event), room_id, path, unsubscribed=True)
+        diagnostics.schedule(room_id, path, file.content, version, entry=True)
+        return {"path": path, "version": version}
+
+    created = await room_registry.open_file(room, path) is None
+    if created:
+        paths = [f["path"] for f in await _file_list(room)]
+        # The new file is not listed yet; the entry file is, and does not count toward the limit
+        if len(paths) - 1 >= room_files.max_files:
+            raise HTTPException(status_code=400, detail=f"Rooms are limited to {room_files.max_files} files")
+        if any(p.startswith(path + "/") or path.startswith(p + "/") for p in paths):
+            raise HTTPException(status_code=409, detail="A file and a folder cannot share a path")
+
+    version = room_registry.update_file(room, path, file.content)
+    activity_tracker.touch(room_id)
+    event = {"type": "file_update", "path": path, "content": file.content, "version": version}
+    await manager.broadcast_to_file(json.dumps(event), room_id, path)
+    diagnostics.schedule(room_id, path, file.content, version)
+    if created:
+        # Persist right away so the new file survives even if this worker dies before the next flush
+        await room_registry.flush_room(room)
+        await _announce_tree(room)
+    return {"path": path, "version": version}
+
+
+@router.delete("/api/rooms/{room_id}/files/{path:path}", status_code=204)
+async def delete_file(room_id: str, path: str, user=Depends(get_current_user)):
+    room = await _room_for(room_id, user)
+    path = _path(path)
+    if path == room.entry_path:
+        raise HTTPException(status_code=400, detail="The entry file cannot be deleted")
+    if not await room_registry.delete_file(room, path):
+        raise HTTPException(status_code=404, detail="File not found")
+    activity_tracker.touch(room_id)
+    await _announce_tree(room)
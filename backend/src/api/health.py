@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from src.core.config import HEALTH_CHECK_TIMEOUT
+from src.core import metrics
+from src.db.mongodb import get_database, pool_stats
+
+router = APIRouter()
+
+
+@router.get("/healthz", include_in_schema=False)
+async def liveness():
+    """Liveness probe: the worker's event loop is serving requests. Never touches the database."""
+    return {"status": "ok", "worker": metrics.WORKER}
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readiness():
+    """Readiness probe: pings MongoDB and reports round-trip latency and pool utilization.
+
+    Returns 503 when the ping fails or exceeds HEALTH_CHECK_TIMEOUT, so load
+    balancers stop routing to a worker that cannot reach the database.
+    """
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(get_database().command("ping"), HEALTH_CHECK_TIMEOUT)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={
+            "status": "unavailable",
+            "worker": metrics.WORKER,
+            "error": str(e) or type(e).__name__,
+            "pool": pool_stats(),
+        })
+    return {
+        "status": "ok",
+        "worker": metrics.WORKER,
+        "db_latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        "pool": pool_stats(),
+    }
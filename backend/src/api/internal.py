@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from src.models.room import RoomDiscard, RoomReload
+from src.services.room_registry import room_registry
+from src.services.room_router import INTERNAL_SCOPE_KEY
+
+router = APIRouter()
+
+
+def internal_only(request: Request):
+    """Worker-to-worker endpoints exist only on the internal routing socket."""
+    if not request.scope.get(INTERNAL_SCOPE_KEY):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.post("/internal/rooms/reload", include_in_schema=False, dependencies=[Depends(internal_only)])
+async def reload_rooms(reload: RoomReload):
+    """Refresh the membership of hot rooms after another worker changed it in Mongo."""
+    for room_id in reload.room_ids:
+        await room_registry.reload_members(room_id)
+    return {"reloaded": len(reload.room_ids)}
+
+
+@router.post("/internal/rooms/discard", include_in_schema=False, dependencies=[Depends(internal_only)])
+async def discard_rooms(discard: RoomDiscard):
+    """Drop hot rooms without writing them back, before another worker deletes their documents."""
+    for room_id in discard.room_ids:
+        await room_registry.discard(room_id)
+    return {"discarded": len(discard.room_ids)}
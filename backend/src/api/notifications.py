@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query
+
+from src.core.firebase_auth import get_current_user
+from src.models.room import NotificationAck
+from src.services.notification_inbox import notification_inbox
+
+router = APIRouter()
+
+
+@router.get("/api/notifications")
+async def list_notifications(
+    user=Depends(get_current_user),
+    after: int = Query(0, ge=0),
+    limit: int = Query(None, ge=1, le=500)
+):
+    """Unacknowledged notifications after the given cursor, oldest first.
+
+    The same items are pushed in one "notifications" frame when the user's
+    socket authenticates; this endpoint pages through the rest when "more" is set.
+    """
+    items, more = await notification_inbox.pending(user["uid"], after, limit)
+    return {"items": items, "cursor": items[-1]["seq"] if items else after, "more": more}
+
+
+@router.post("/api/notifications/ack")
+async def acknowledge_notifications(ack: NotificationAck, user=Depends(get_current_user)):
+    """Mark every notification up to and including the cursor as read."""
+    acknowledged = await notification_inbox.ack(user["uid"], ack.cursor)
+    return {"acknowledged": acknowledged}
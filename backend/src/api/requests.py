@@ -2,15 +2,17 @@ from fastapi import APIRouter, Depends, HTTPException, Body
 from bson import ObjectId, errors as bson_errors
 from typing import List
 from datetime import datetime, timezone
-import json
 import logging
 
 from src.db.mongodb import db, get_feedback_collection, append_feedback_to_gsheet
+from src.core.firebase_admin import get_auth
 from src.core.firebase_auth import get_current_user
+from src.core.metrics import FIREBASE_CALL_DURATION
 from src.models.room import JoinRequest
 from src.services.websocket_manager import manager
+from src.services.room_registry import room_registry
+from src.services.room_router import room_router
 from pydantic import BaseModel, EmailStr, Field
-from firebase_admin import auth as firebase_auth
 
 router = APIRouter()
 
@@ -51,19 +53,16 @@ async def request_to_join_room(room_id: str, user=Depends(get_current_user)):
     result = await db.join_requests.insert_one(new_request.model_dump())
     request_id = str(result.inserted_id)
     # Send real-time notification to owner with request_id
-    await manager.send_notification_to_user(
-        owner_uid,
-        json.dumps({
-            "type": "notification",
-            "subtype": "join_request",
-            "room_id": room_id,
-            "room_name": room["name"],
-            "requester_email": user["email"],
-            "requester_uid": requester_uid,
-            "request_id": request_id,
-            "message": f"{user['email']} requested to join '{room['name']}'"
-        })
-    )
+    manager.notify(owner_uid, {
+        "type": "notification",
+        "subtype": "join_request",
+        "room_id": room_id,
+        "room_name": room["name"],
+        "requester_email": user["email"],
+        "requester_uid": requester_uid,
+        "request_id": request_id,
+        "message": f"{user['email']} requested to join '{room['name']}'"
+    })
     return {"message": "Your request to join has been sent to the room owner."}
 
 
@@ -110,6 +109,8 @@ async def approve_join_request(request_id: str, user=Depends(get_current_user)):
         {"_id": ObjectId(request["room_id"])},
         {"$addToSet": {"shared_with": request["requester_uid"]}}
     )
+    room_registry.grant(request["room_id"], request["requester_uid"])
+    await room_router.members_changed([request["room_id"]])
 
     # Update the request status
     await db.join_requests.update_one(
@@ -119,16 +120,13 @@ async def approve_join_request(request_id: str, user=Depends(get_current_user)):
 
     # Send real-time notification to requester
     room = await db.rooms.find_one({"_id": ObjectId(request["room_id"])} )
-    await manager.send_notification_to_user(
-        request["requester_uid"],
-        json.dumps({
-            "type": "notification",
-            "subtype": "join_request_approved",
-            "room_id": request["room_id"],
-            "room_name": room["name"] if room else "",
-            "message": f"Your request to join '{room['name'] if room else ''}' was approved."
-        })
-    )
+    manager.notify(request["requester_uid"], {
+        "type": "notification",
+        "subtype": "join_request_approved",
+        "room_id": request["room_id"],
+        "room_name": room["name"] if room else "",
+        "message": f"Your request to join '{room['name'] if room else ''}' was approved."
+    })
     return {"message": "Request approved. User has been added to the room."}
 
 
@@ -155,16 +153,13 @@ async def deny_join_request(request_id: str, user=Depends(get_current_user)):
 
     # Send real-time notification to requester
     room = await db.rooms.find_one({"_id": ObjectId(request["room_id"])} )
-    await manager.send_notification_to_user(
-        request["requester_uid"],
-        json.dumps({
-            "type": "notification",
-            "subtype": "join_request_denied",
-            "room_id": request["room_id"],
-            "room_name": room["name"] if room else "",
-            "message": f"Your request to join '{room['name'] if room else ''}' was denied."
-        })
-    )
+    manager.notify(request["requester_uid"], {
+        "type": "notification",
+        "subtype": "join_request_denied",
+        "room_id": request["room_id"],
+        "room_name": room["name"] if room else "",
+        "message": f"Your request to join '{room['name'] if room else ''}' was denied."
+    })
     return {"message": "Request denied."}
 
 
@@ -208,12 +203,15 @@ async def forgot_password(payload: dict = Body(...)):
     email = payload.get("email")
     if not email:
         raise HTTPException(status_code=400, detail="Email is required.")
+    firebase_auth = get_auth()
     try:
-        user = firebase_auth.get_user_by_email(email)
+        with FIREBASE_CALL_DURATION.time("get_user_by_email"):
+            user = firebase_auth.get_user_by_email(email)
     except firebase_auth.UserNotFoundError:
         raise HTTPException(status_code=404, detail="No account found with this email address.")
     try:
-        firebase_auth.generate_password_reset_link(email)
+        with FIREBASE_CALL_DURATION.time("generate_password_reset_link"):
+            firebase_auth.generate_password_reset_link(email)
         # Optionally, you can send the link via your own email service, or rely on Firebase's default email
         return {"message": "Password reset email sent! Please check your inbox."}
     except Exception as e:
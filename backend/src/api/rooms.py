@@ -1,5 +1,6 @@
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from bson import ObjectId, errors as bson_errors
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Body, Query
 import pymongo
@@ -10,20 +11,85 @@ from src.models.room import (
     ShareRequest, ShareByEmailRequest
 )
 from src.services.websocket_manager import manager
-from src.services.code_executor import execute_python_code, execute_python_code_multiple
+from src.services.activity_tracker import activity_tracker
+from src.services.room_files import room_files, entry_path, normalize_path
+from src.services.room_history import room_history
+from src.services.room_registry import room_registry, RoomMoved
+from src.services.room_router import ROOM_MOVED_CODE
+from src.services.code_executor import execute_code, execute_code_multiple
+from src.services.diagnostics import diagnostics
+from src.services.language_runners import get_runner, supported_languages
+from src.core.firebase_admin import get_auth
 from src.core.firebase_auth import get_current_user
-from firebase_admin import auth as firebase_auth
+from src.core.metrics import FIREBASE_CALL_DURATION, WS_MESSAGES
+from src.core.tracing import span, trace
 
 router = APIRouter()
 
+# Frame types clients may send over a room socket (anything else is counted as "other")
+CLIENT_MESSAGE_TYPES = {
+    "code_update", "cp_mode_update", "cp_testcases_update", "chat_message", "subscribe", "file_update",
+}
+
+
+async def _send(websocket: WebSocket, payload: dict):
+    await websocket.send_text(json.dumps(payload))
+    WS_MESSAGES.inc("out", payload["type"])
+
+
+async def _send_initial_state(websocket: WebSocket, room_id: str, last_version):
+    """Send a reconnecting client only what it missed since last_version, or the full state.
+
+    The socket joins the room's broadcasts right after the state is captured,
+    with no await in between, so every event is either part of that state or
+    broadcast to the socket after it, never before it.
+    """
+    room = await room_registry.acquire(room_id)
+    if room is None:
+        # No backing room, e.g. the dashboard's /ws/notifications socket
+        manager.join(websocket, room_id)
+        await _send(websocket, {"type": "chat_history", "messages": []})
+        return
+
+    while True:
+        version = room.version
+        if isinstance(last_version, int):
+            events = room_history.since(room_id, last_version, version)
+            if events is not None:
+                payload = {"type": "catch_up", "version": version, "events": events}
+                break
+            # Gap too large for the buffer: fall back to a full snapshot
+            payload = {
+                "type": "room_snapshot",
+                "version": version,
+                "code": room.code,
+                "messages": await room_registry.chat_history(room)
+            }
+        else:
+            history = await room_registry.chat_history(room)
+            payload = {"type": "chat_history", "messages": history, "version": version}
+        if room.version == version:
+            break
+        # Edited while the chat history loaded from Mongo: capture again
+    manager.join(websocket, room_id)
+    await _send(websocket, payload)
+
+@router.get("/api/languages")
+async def list_languages():
+    """List the languages that can be executed on this server."""
+    return {"languages": supported_languages()}
+
 @router.post("/api/rooms", status_code=201)
 async def create_room(room_create: RoomCreate, user=Depends(get_current_user)):
     """Create a new room, owned by the authenticated user."""
+    runner = get_runner(room_create.language)
+    if runner is None:
+        raise HTTPException(status_code=400, detail="Unsupported language")
     now = datetime.now(timezone.utc)
     room_data = {
         "name": room_create.name,
-        "code": "# Welcome to the collaborative Python editor!\\nprint('Hello, World!')",
-        "language": "python",
+        "code": runner.welcome_code,
+        "language": runner.language,
         "created_at": now,
         "last_activity": now,
         "owner": user["uid"],
@@ -46,7 +112,10 @@ async def delete_room(room_id: str, user=Depends(get_current_user)):
     if room["owner"] != user["uid"]:
         raise HTTPException(status_code=403, detail="Only the owner can delete this room")
     
+    await room_registry.discard(room_id)
     await db.rooms.delete_one({"_id": obj_id})
+    await room_files.delete_rooms([room_id])
+    activity_tracker.forget(room_id)
     return
 
 
@@ -67,11 +136,20 @@ async def rename_room(room_id: str, room_update: RoomUpdate, user=Depends(get_cu
     update_data = room_update.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="No update data provided")
+    if "language" in update_data:
+        runner = get_runner(update_data["language"])
+        if runner is None:
+            raise HTTPException(status_code=400, detail="Unsupported language")
+        update_data["language"] = runner.language
 
     result = await db.rooms.update_one(
         {"_id": obj_id},
         {"$set": update_data}
     )
+    hot = room_registry.get(room_id)
+    if hot:
+        hot.name = update_data.get("name", hot.name)
+        hot.language = update_data.get("language", hot.language)
     if result.modified_count == 1:
         return {"message": "Room renamed successfully"}
     raise HTTPException(status_code=400, detail="Could not rename room")
@@ -90,15 +168,25 @@ async def get_room(room_id: str, user=Depends(get_current_user)):
     if room["owner"] != user["uid"] and user["uid"] not in room.get("shared_with", []):
         raise HTTPException(status_code=403, detail="Not authorized to access this room")
     room["_id"] = str(room["_id"])
+    room["last_activity"] = activity_tracker.last_touch(room_id) or room.get("last_activity")
+    hot = room_registry.get(room_id)
+    if hot:
+        # Edits not yet written back live only in memory
+        room.update(hot.as_doc())
+    room["entry_file"] = entry_path(room.get("language", "python"))
     return room
 
 @router.get("/api/rooms")
 async def list_rooms(
     user=Depends(get_current_user),
     owned: bool = Query(False),
-    shared: bool = Query(False)
+    shared: bool = Query(False),
+    idle_days: Optional[int] = Query(None, ge=1)
 ):
-    """List rooms owned by or shared with the authenticated user, or filter by type."""
+    """List rooms owned by or shared with the authenticated user, or filter by type.
+
+    With idle_days, only rooms with no activity in that many days are returned.
+    """
     query = None
     if owned:
         query = {"owner": user["uid"]}
@@ -110,10 +198,19 @@ async def list_rooms(
             {"shared_with": user["uid"]}
         ]}
     
+    cutoff = None
+    if idle_days:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=idle_days)
+        query = {"$and": [query, {"last_activity": {"$lt": cutoff}}]}
+
     rooms_cursor = db.rooms.find(query).sort("created_at", pymongo.DESCENDING)
     rooms = []
     async for room in rooms_cursor:
         room["_id"] = str(room["_id"])
+        # Touches still buffered in memory are newer than what Mongo has
+        if cutoff and activity_tracker.is_active_since(room["_id"], cutoff):
+            continue
+        room["last_activity"] = activity_tracker.last_touch(room["_id"]) or room.get("last_activity")
         rooms.append(room)
     return rooms
 
@@ -121,66 +218,61 @@ async def list_rooms(
 async def update_code(room_id: str, code_update: CodeUpdate, user=Depends(get_current_user)):
     """Update code in a room if the user is the owner or shared_with."""
     try:
-        room = await db.rooms.find_one({"_id": ObjectId(room_id)})
+        with span("load_room"):
+            room = await room_registry.acquire(room_id)
         if not room:
             raise HTTPException(status_code=404, detail="Room not found")
-        if room["owner"] != user["uid"] and user["uid"] not in room.get("shared_with", []):
+        if not room.can_access(user["uid"]):
             raise HTTPException(status_code=403, detail="Not authorized to update this room")
-        result = await db.rooms.update_one(
-            {"_id": ObjectId(room_id)},
-            {"$set": {
-                "code": code_update.code,
-                "last_activity": datetime.now(timezone.utc)
-            }}
-        )
-        await manager.broadcast_to_room(
-            json.dumps({"type": "code_update", "code": code_update.code}),
-            room_id
-        )
+        event = {"type": "code_update", "code": code_update.code}
+        room_registry.update_code(room, event)
+        activity_tracker.touch(room_id)
+        await manager.broadcast_to_file(json.dumps(event), room_id, room.entry_path, unsubscribed=True)
+        diagnostics.schedule(room_id, room.entry_path, room.code, room.version, entry=True)
         return {"message": "Code updated successfully"}
+    except RoomMoved:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid room ID")
 
 @router.post("/api/rooms/{room_id}/execute")
 async def execute_code_in_room(room_id: str, execute_request: ExecuteCode, user=Depends(get_current_user)):
-    """Execute Python code for one or more test cases and broadcast the result if the user is authorized."""
+    """Execute code for one or more test cases and broadcast the result if the user is authorized."""
     try:
-        room = await db.rooms.find_one({"_id": ObjectId(room_id)})
+        with span("load_room"):
+            hot = room_registry.get(room_id)
+            room = hot.as_doc() if hot else await db.rooms.find_one({"_id": ObjectId(room_id)})
         if not room:
             return {"stdout": "", "stderr": "Room not found", "returncode": 1}
         if room["owner"] != user["uid"] and user["uid"] not in room.get("shared_with", []):
             return {"stdout": "", "stderr": "Not authorized to execute code in this room", "returncode": 1}
+        language = execute_request.language or room.get("language", "python")
+        # Clients viewing another file are not subscribed to the entry file, so they send no code
+        code = execute_request.code if execute_request.code is not None else room.get("code", "")
+        # The other files are only gathered now, when the workspace is actually run
+        with span("load_workspace"):
+            files = await room_registry.workspace(room_id)
         # If test case inputs are provided
         if execute_request.inputs:
             if len(execute_request.inputs) == 1:
-                from src.services.code_executor import execute_python_code_with_input
-                result = await execute_python_code_with_input(execute_request.code, execute_request.inputs[0])
-                await db.rooms.update_one(
-                    {"_id": ObjectId(room_id)},
-                    {"$set": {"last_activity": datetime.now(timezone.utc)}}
-                )
+                result = await execute_code(code, language, execute_request.inputs[0], files)
+                activity_tracker.touch(room_id)
                 await manager.broadcast_to_room(
                     json.dumps({"type": "execution_result", "output": result}),
                     room_id
                 )
                 return result
             else:
-                outputs = await execute_python_code_multiple(execute_request.code, execute_request.inputs)
-                await db.rooms.update_one(
-                    {"_id": ObjectId(room_id)},
-                    {"$set": {"last_activity": datetime.now(timezone.utc)}}
-                )
+                outputs = await execute_code_multiple(code, language, execute_request.inputs, files)
+                activity_tracker.touch(room_id)
                 await manager.broadcast_to_room(
                     json.dumps({"type": "execution_result", "output": outputs}),
                     room_id
                 )
                 return outputs
         # Single run as before
-        output = await execute_python_code(execute_request.code)
-        await db.rooms.update_one(
-            {"_id": ObjectId(room_id)},
-            {"$set": {"last_activity": datetime.now(timezone.utc)}}
-        )
+        output = await execute_code(code, language, files=files)
+        activity_tracker.touch(room_id)
         await manager.broadcast_to_room(
             json.dumps({"type": "execution_result", "output": output}),
             room_id
@@ -189,42 +281,110 @@ async def execute_code_in_room(room_id: str, execute_request: ExecuteCode, user=
     except Exception as e:
         return {"stdout": "", "stderr": f"Error: {str(e)}", "returncode": 1}
 
+async def _send_files(websocket: WebSocket, room, paths):
+    """Send the current content of each file a socket just opened, and its latest diagnostics."""
+    for path in paths:
+        file = await room_registry.open_file(room, path)
+        if file is not None:
+            await _send(websocket, {
+                "type": "file_content", "path": path, "content": file["content"], "version": file["version"]
+            })
+            latest = diagnostics.latest(room.room_id, path)
+            if latest is not None:
+                await _send(websocket, latest)
+
+
+async def _handle_socket_message(websocket: WebSocket, room_id: str, data: str, message: dict):
+    if message["type"] == "code_update":
+        with span("load_room"):
+            room = await room_registry.acquire(room_id)
+        if room:
+            room_registry.update_code(room, message)
+            activity_tracker.touch(room_id)
+            await manager.broadcast_to_file(json.dumps(message), room_id, room.entry_path, websocket, unsubscribed=True)
+            diagnostics.schedule(room_id, room.entry_path, room.code, room.version, entry=True)
+        else:
+            await manager.broadcast_to_room(json.dumps(message), room_id, websocket)
+    elif message["type"] == "subscribe":
+        # The files this client has open; it only receives edits to these from now on
+        paths = [normalize_path(path) for path in message.get("paths", [])[:room_files.max_files]]
+        paths = [path for path in dict.fromkeys(paths) if path]
+        with span("load_room"):
+            room = await room_registry.acquire(room_id)
+        if room:
+            manager.subscribe(websocket, set(paths))
+            with span("load_files"):
+                await _send_files(websocket, room, paths)
+    elif message["type"] == "file_update":
+        path = normalize_path(message.get("path"))
+        content = message.get("content")
+        if not path or not isinstance(content, str) or len(content.encode()) > room_files.max_file_bytes:
+            return
+        with span("load_room"):
+            room = await room_registry.acquire(room_id)
+        if not room:
+            return
+        if path == room.entry_path:
+            await _handle_socket_message(websocket, room_id, data, {"type": "code_update", "code": content})
+            return
+        # Only existing files are edited over the socket; they are created with PUT /files/{path}
+        if await room_registry.open_file(room, path) is None:
+            return
+        version = room_registry.update_file(room, path, content)
+        activity_tracker.touch(room_id)
+        event = {"type": "file_update", "path": path, "content": content, "version": version}
+        await manager.broadcast_to_file(json.dumps(event), room_id, path, websocket)
+        diagnostics.schedule(room_id, path, content, version)
+    elif message["type"] in ("cp_mode_update", "cp_testcases_update"):
+        await manager.broadcast_to_room(data, room_id, websocket)
+    elif message["type"] == "chat_message":
+        with span("load_room"):
+            room = await room_registry.acquire(room_id)
+        if room:
+            # Kept in memory and written back with the room's next flush
+            room_registry.add_chat(room, message)
+            data = json.dumps(message)
+        else:
+            # Store message in DB
+            with span("store_chat"):
+                await db.chat_messages.update_one(
+                    {"room_id": room_id},
+                    {"$push": {"messages": message}},
+                    upsert=True
+                )
+        await manager.broadcast_to_room(data, room_id)
+        await websocket.send_text(data)
+        WS_MESSAGES.inc("out", "chat_message")
+
+
 @router.websocket("/ws/{room_id}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str):
-    await manager.connect(websocket, room_id)
-    # On connect, send chat history
-    doc = await db.chat_messages.find_one({"room_id": room_id})
-    history = doc["messages"] if doc and "messages" in doc else []
-    await websocket.send_text(json.dumps({"type": "chat_history", "messages": history}))
+    auth = await manager.connect(websocket, room_id)
+    # On connect, send chat history (or just the missed changes when reconnecting)
+    try:
+        with trace("ws connect"):
+            await _send_initial_state(websocket, room_id, auth.get("last_version"))
+    except RoomMoved:
+        manager.disconnect(websocket, room_id)
+        await websocket.close(code=ROOM_MOVED_CODE, reason="room moved")
+        return
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
-            if message["type"] == "code_update":
-                await db.rooms.update_one(
-                    {"_id": ObjectId(room_id)},
-                    {"$set": {
-                        "code": message["code"],
-                        "last_activity": datetime.now(timezone.utc)
-                    }}
-                )
-                await manager.broadcast_to_room(data, room_id, websocket)
-            elif message["type"] in ("cp_mode_update", "cp_testcases_update"):
-                await manager.broadcast_to_room(data, room_id, websocket)
-            elif message["type"] == "chat_message":
-                # Store message in DB
-                await db.chat_messages.update_one(
-                    {"room_id": room_id},
-                    {"$push": {"messages": message}},
-                    upsert=True
-                )
-                await manager.broadcast_to_room(data, room_id)
-                await websocket.send_text(data)
+            message_type = message["type"] if message.get("type") in CLIENT_MESSAGE_TYPES else "other"
+            WS_MESSAGES.inc("in", message_type)
+            with trace(f"ws {message_type}"):
+                try:
+                    await _handle_socket_message(websocket, room_id, data, message)
+                except RoomMoved:
+                    # Dropped: the room is being handed off and this socket is closed once it is written back
+                    pass
     except WebSocketDisconnect:
         manager.disconnect(websocket, room_id)
     except RuntimeError as e:
         print(f"WebSocket send error: {e}")
-    
+
 
 @router.post("/api/rooms/{room_id}/share")
 async def share_room(room_id: str, share_request: ShareRequest, user=Depends(get_current_user)):
@@ -243,18 +403,16 @@ async def share_room(room_id: str, share_request: ShareRequest, user=Depends(get
         {"_id": ObjectId(room_id)},
         {"$addToSet": {"shared_with": share_with_uid}}
     )
+    room_registry.grant(room_id, share_with_uid)
     # Send real-time notification
-    await manager.send_notification_to_user(
-        share_with_uid,
-        json.dumps({
-            "type": "notification",
-            "subtype": "room_shared",
-            "room_id": room_id,
-            "room_name": room["name"],
-            "from_email": user["email"],
-            "message": f"Room '{room['name']}' was shared with you by {user['email']}"
-        })
-    )
+    manager.notify(share_with_uid, {
+        "type": "notification",
+        "subtype": "room_shared",
+        "room_id": room_id,
+        "room_name": room["name"],
+        "from_email": user["email"],
+        "message": f"Room '{room['name']}' was shared with you by {user['email']}"
+    })
     return {"message": "Room shared successfully"}
 
 @router.post("/api/rooms/{room_id}/share-by-email")
@@ -263,8 +421,10 @@ async def share_room_by_email(room_id: str, request: ShareByEmailRequest, user=D
     email = request.email
     if not email:
         raise HTTPException(status_code=400, detail="Missing email")
+    firebase_auth = get_auth()
     try:
-        target_user = firebase_auth.get_user_by_email(email)
+        with FIREBASE_CALL_DURATION.time("get_user_by_email"):
+            target_user = firebase_auth.get_user_by_email(email)
     except firebase_auth.UserNotFoundError:
         raise HTTPException(status_code=404, detail="User with this email not found")
     share_with_uid = target_user.uid
@@ -281,18 +441,16 @@ async def share_room_by_email(room_id: str, request: ShareByEmailRequest, user=D
         {"_id": ObjectId(room_id)},
         {"$addToSet": {"shared_with": share_with_uid}}
     )
+    room_registry.grant(room_id, share_with_uid)
     # Send real-time notification
-    await manager.send_notification_to_user(
-        share_with_uid,
-        json.dumps({
-            "type": "notification",
-            "subtype": "room_shared",
-            "room_id": room_id,
-            "room_name": room["name"],
-            "from_email": user["email"],
-            "message": f"Room '{room['name']}' was shared with you by {user['email']}"
-        })
-    )
+    manager.notify(share_with_uid, {
+        "type": "notification",
+        "subtype": "room_shared",
+        "room_id": room_id,
+        "room_name": room["name"],
+        "from_email": user["email"],
+        "message": f"Room '{room['name']}' was shared with you by {user['email']}"
+    })
     return {"message": f"Room shared with {email} successfully"}
 
 @router.get("/api/rooms/{room_id}/members")
@@ -304,10 +462,12 @@ async def get_room_members(room_id: str, user=Depends(get_current_user)):
     if room["owner"] != user["uid"] and user["uid"] not in room.get("shared_with", []):
         raise HTTPException(status_code=403, detail="Not authorized to view members of this room")
     uids = [room["owner"]] + room.get("shared_with", [])
+    firebase_auth = get_auth()
     members = []
     for uid in uids:
         try:
-            firebase_user = firebase_auth.get_user(uid)
+            with FIREBASE_CALL_DURATION.time("get_user"):
+                firebase_user = firebase_auth.get_user(uid)
             members.append({
                 "uid": uid,
                 "email": firebase_user.email,
@@ -338,17 +498,15 @@ async def remove_user_from_room(room_id: str, payload: dict = Body(...), user=De
         {"_id": obj_id},
         {"$pull": {"shared_with": remove_uid}}
     )
+    room_registry.revoke(room_id, remove_uid)
     # Send real-time notification to the removed user
-    await manager.send_notification_to_user(
-        remove_uid,
-        json.dumps({
-            "type": "notification",
-            "subtype": "removed_from_room",
-            "room_id": room_id,
-            "room_name": room["name"],
-            "message": f"You have been removed from the room '{room['name']}' by the owner."
-        })
-    )
+    manager.notify(remove_uid, {
+        "type": "notification",
+        "subtype": "removed_from_room",
+        "room_id": room_id,
+        "room_name": room["name"],
+        "message": f"You have been removed from the room '{room['name']}' by the owner."
+    })
     return {"message": "User access removed from the room."}
 
 @router.get("/api/rooms/{room_id}/chat")
@@ -358,6 +516,9 @@ async def get_chat_history(room_id: str, user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="Room not found")
     if room["owner"] != user["uid"] and user["uid"] not in room.get("shared_with", []):
         raise HTTPException(status_code=403, detail="Not authorized to view chat history")
+    hot = room_registry.get(room_id)
+    if hot:
+        return await room_registry.chat_history(hot)
     doc = await db.chat_messages.find_one({"room_id": room_id})
     return doc["messages"] if doc and "messages" in doc else []
 
@@ -368,5 +529,12 @@ async def clear_chat_history(room_id: str, user=Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="Room not found")
     if room["owner"] != user["uid"]:
         raise HTTPException(status_code=403, detail="Only the owner can clear chat history")
-    await db.chat_messages.update_one({"room_id": room_id}, {"$set": {"messages": []}}, upsert=True)
+    hot = room_registry.get(room_id)
+    if hot:
+        await room_registry.clear_chat(hot)
+    else:
+        await db.chat_messages.update_one({"room_id": room_id}, {"$set": {"messages": []}}, upsert=True)
+        # Buffered chat is stale now; bumping the version sends reconnecting clients a snapshot
+        await db.rooms.update_one({"_id": ObjectId(room_id)}, {"$inc": {"version": 1}})
+        room_history.drop(room_id)
     return {"message": "Chat history cleared"} 
\ No newline at end of file
@@ -0,0 +1,32 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.core.firebase_auth import get_current_user
+from src.core.tracing import span
+from src.services.room_search import room_search, KINDS
+
+router = APIRouter()
+
+
+@router.get("/api/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[List[str]] = Query(None),
+    offset: int = Query(0, ge=0, le=500),
+    limit: int = Query(20, ge=1, le=50),
+    user=Depends(get_current_user)
+):
+    """Search room names, code, files and chat across the rooms the user owns or was shared.
+
+    Hits are ranked by relevance and carry a snippet around the first match
+    (with its line number for code and files). Filter with kind=room|code|file|chat,
+    repeated for several; page with offset while "more" is set.
+    """
+    kinds = tuple(kind) if kind else KINDS
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search kind: {', '.join(sorted(unknown))}")
+    with span("search"):
+        items, more = await room_search.search(user["uid"], q, kinds, offset, limit)
+    return {"items": items, "offset": offset, "more": more}
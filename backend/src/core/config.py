@@ -1,6 +1,88 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
-MONGO_DETAILS = os.getenv("MONGO_DETAILS", "mongodb://localhost:27017") 
\ No newline at end of file
+MONGO_DETAILS = os.getenv("MONGO_DETAILS", "mongodb://localhost:27017")
+
+
+def _optional_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+# MongoDB client pool and timeouts (milliseconds). Unset optional values keep
+# the driver default or whatever the connection string specifies.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = _optional_int("MONGO_MAX_IDLE_TIME_MS")
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = _optional_int("MONGO_SOCKET_TIMEOUT_MS")
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS")  # max wait for a free pooled connection
+# Write concern ("majority" or a node count) and read preference ("primary", "secondaryPreferred", ...)
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN")
+MONGO_WRITE_TIMEOUT_MS = _optional_int("MONGO_WRITE_TIMEOUT_MS")
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE")
+
+# Seconds the readiness probe waits for a database ping before reporting not ready
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+# Compiled binaries are cached on disk, keyed by a hash of source and compiler flags
+EXECUTION_CACHE_DIR = os.getenv("EXECUTION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "devsync-artifacts"))
+EXECUTION_CACHE_MAX_BYTES = int(os.getenv("EXECUTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Per-run sandbox limits for code execution
+EXECUTION_CPU_SECONDS = int(os.getenv("EXECUTION_CPU_SECONDS", "10"))
+# Wall clock; longer than the CPU limit so CPU-bound programs are reported as hitting that instead
+EXECUTION_TIMEOUT = float(os.getenv("EXECUTION_TIMEOUT", str(EXECUTION_CPU_SECONDS + 2)))
+EXECUTION_MEMORY_BYTES = int(os.getenv("EXECUTION_MEMORY_BYTES", str(256 * 1024 * 1024)))
+EXECUTION_MAX_PROCESSES = int(os.getenv("EXECUTION_MAX_PROCESSES", "64"))
+# RLIMIT_NPROC counts every process of the user, server included: only enable it when runs use a dedicated UID
+EXECUTION_RLIMIT_NPROC = os.getenv("EXECUTION_RLIMIT_NPROC", "false").lower() not in ("0", "false", "no")
+EXECUTION_MAX_OUTPUT_BYTES = int(os.getenv("EXECUTION_MAX_OUTPUT_BYTES", str(1024 * 1024)))  # stdout + stderr
+EXECUTION_MAX_FILE_BYTES = int(os.getenv("EXECUTION_MAX_FILE_BYTES", str(16 * 1024 * 1024)))
+# Optional delegated cgroup v2 directory; each run gets a child cgroup with memory.max/pids.max
+EXECUTION_CGROUP = os.getenv("EXECUTION_CGROUP")
+
+# Seconds between batched writes of buffered room last_activity touches
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "30"))
+
+# Recent changes kept per room so reconnecting clients can catch up without a full snapshot
+CATCHUP_BUFFER_SIZE = int(os.getenv("CATCHUP_BUFFER_SIZE", "256"))
+
+# Active rooms are served from memory and written back to Mongo in the background
+ROOM_FLUSH_INTERVAL = float(os.getenv("ROOM_FLUSH_INTERVAL", "2"))  # seconds between write-backs
+ROOM_IDLE_SECONDS = float(os.getenv("ROOM_IDLE_SECONDS", "300"))    # hibernate after this long with no sockets
+ROOM_MEMORY_BUDGET_BYTES = int(os.getenv("ROOM_MEMORY_BUDGET_BYTES", str(256 * 1024 * 1024)))
+ROOM_CHAT_CACHE_SIZE = int(os.getenv("ROOM_CHAT_CACHE_SIZE", "500"))  # recent chat messages kept per room
+# Files beside a room's entry file, each stored as its own document
+ROOM_MAX_FILES = int(os.getenv("ROOM_MAX_FILES", "100"))
+ROOM_MAX_FILE_BYTES = int(os.getenv("ROOM_MAX_FILE_BYTES", str(1024 * 1024)))
+
+# Server-side diagnostics (syntax errors and lint) for Python files, computed in worker processes
+DIAGNOSTICS_ENABLED = os.getenv("DIAGNOSTICS_ENABLED", "true").lower() not in ("0", "false", "no")
+DIAGNOSTICS_DEBOUNCE = float(os.getenv("DIAGNOSTICS_DEBOUNCE", "0.5"))  # seconds; at most one run per file per interval
+DIAGNOSTICS_WORKERS = int(os.getenv("DIAGNOSTICS_WORKERS", "1"))
+DIAGNOSTICS_MAX_BYTES = int(os.getenv("DIAGNOSTICS_MAX_BYTES", str(512 * 1024)))  # larger files are not analyzed
+
+# Room affinity across worker processes on one host. When set, each worker listens on
+# a Unix socket in this directory and room traffic is proxied to the room's owning worker
+ROOM_ROUTING_DIR = os.getenv("ROOM_ROUTING_DIR")
+ROOM_ROUTING_HEARTBEAT = float(os.getenv("ROOM_ROUTING_HEARTBEAT", "2"))  # seconds between membership refreshes
+ROOM_ROUTING_VNODES = int(os.getenv("ROOM_ROUTING_VNODES", "64"))  # hash ring points per worker
+
+# Undelivered notifications are kept per user until acknowledged, or for this many days
+NOTIFICATION_TTL_DAYS = float(os.getenv("NOTIFICATION_TTL_DAYS", "30"))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "100"))  # max items per delivered frame
+
+# If set, GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Requests and WebSocket messages slower than this are logged with a per-stage breakdown
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+
+# Firebase UIDs allowed to use the admin endpoints (comma-separated); users with an
+# "admin" custom claim are always allowed
+ADMIN_UIDS = {uid.strip() for uid in os.getenv("ADMIN_UIDS", "").split(",") if uid.strip()}
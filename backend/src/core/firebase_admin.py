@@ -1,6 +1,5 @@
-import firebase_admin
-from firebase_admin import credentials
 import os
+import threading
 
 # Use environment variable for the service account key path
 SERVICE_ACCOUNT_PATH = os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH')
@@ -8,5 +7,36 @@ if not SERVICE_ACCOUNT_PATH:
     # Fallback to the default relative path for local development
     SERVICE_ACCOUNT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'serviceAccountKey.json')
 
-cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
-firebase_admin_app = firebase_admin.initialize_app(cred) 
\ No newline at end of file
+# The Admin SDK (and google-auth beneath it) is imported and initialized on first
+# use rather than at import, so workers boot without paying for it.
+firebase_admin_app = None
+_lock = threading.Lock()
+
+
+def get_firebase_app():
+    """The Firebase Admin app, initialized from the service account on first call."""
+    global firebase_admin_app
+    if firebase_admin_app is None:
+        with _lock:
+            if firebase_admin_app is None:
+                import firebase_admin
+                from firebase_admin import credentials
+                cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
+                firebase_admin_app = firebase_admin.initialize_app(cred)
+    return firebase_admin_app
+
+
+def get_auth():
+    """The firebase_admin.auth module, with the app initialized."""
+    get_firebase_app()
+    from firebase_admin import auth
+    return auth
+
+
+def close_firebase_app():
+    global firebase_admin_app
+    with _lock:
+        if firebase_admin_app is not None:
+            import firebase_admin
+            firebase_admin.delete_app(firebase_admin_app)
+            firebase_admin_app = None
@@ -1,6 +1,8 @@
 from fastapi import Request, HTTPException, status, Depends
-from firebase_admin import auth as firebase_auth
-from .firebase_admin import firebase_admin_app  # Ensure initialization
+from .firebase_admin import get_auth
+from .metrics import FIREBASE_CALL_DURATION
+from .tracing import span
+from .config import ADMIN_UIDS
 
 async def get_current_user(request: Request):
     auth_header = request.headers.get("Authorization")
@@ -8,8 +10,14 @@ async def get_current_user(request: Request):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing auth token")
     token = auth_header.split(" ")[1]
     try:
-        decoded_token = firebase_auth.verify_id_token(token)
+        with span("verify_token"), FIREBASE_CALL_DURATION.time("verify_id_token"):
+            decoded_token = get_auth().verify_id_token(token)
         return decoded_token  # contains 'uid', 'email', etc.
     except Exception as e:
         print(f"Token verification error: {e}")  # Log the real error
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth token") 
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth token")
+
+async def get_admin_user(user=Depends(get_current_user)):
+    if user.get("admin") is not True and user["uid"] not in ADMIN_UIDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
@@ -0,0 +1,235 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Each metric keeps its samples in a dict keyed by label values, so recording is a
+dict lookup plus an add under an uncontended lock (pymongo's command listeners
+call in from Motor's worker threads). Every sample carries the worker's pid, as
+each gunicorn worker serves its own registry.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond broadcasts to multi-second executions
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+WORKER = str(os.getpid())
+
+
+def _refresh_worker():
+    global WORKER
+    WORKER = str(os.getpid())
+
+
+# gunicorn --preload imports the app in the master before forking workers
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_refresh_worker)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = ("worker", *labelnames)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Sequence[str]) -> Tuple[str, ...]:
+        return (WORKER, *labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """A gauge set directly, or computed at scrape time by a callback returning (labels, value) pairs."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 collect: Callable[[], Iterable[Tuple[Sequence[str], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, *labels: str, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> List[str]:
+        if self._collect is not None:
+            items = [(self._key(labels), value) for labels, value in self._collect()]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # label key -> [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(counts), total) for k, (counts, total) in self._values.items()]
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (), collect=None) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames, collect))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Application metrics. Modules record into these directly.
+HTTP_REQUEST_DURATION = histogram(
+    "devsync_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+WS_MESSAGES = counter(
+    "devsync_ws_messages_total", "WebSocket frames received (in) and sent (out) by message type.", ("direction", "type"))
+BROADCAST_DURATION = histogram(
+    "devsync_broadcast_duration_seconds", "Time to fan a message out to a room's sockets.")
+BROADCAST_RECIPIENTS = counter(
+    "devsync_broadcast_recipients_total", "Sockets a room broadcast was delivered to.")
+MONGO_COMMAND_DURATION = histogram(
+    "devsync_mongo_command_duration_seconds", "MongoDB command round-trip latency.", ("command", "outcome"))
+FIREBASE_CALL_DURATION = histogram(
+    "devsync_firebase_call_duration_seconds", "Firebase Admin call latency.", ("operation",))
+EXECUTIONS_IN_PROGRESS = gauge(
+    "devsync_executions_in_progress", "Code executions currently queued or running.")
+EXECUTION_DURATION = histogram(
+    "devsync_execution_duration_seconds", "Code execution duration including compilation.", ("language", "outcome"))
+DIAGNOSTICS_DURATION = histogram(
+    "devsync_diagnostics_duration_seconds", "Time to compute diagnostics for a file, including the worker round trip.",
+    ("outcome",))
+DIAGNOSTICS_BLOCKS = counter(
+    "devsync_diagnostics_blocks_total", "Top-level blocks analyzed (parsed) or served from the block cache (cached).",
+    ("result",))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route HTTP latency.
+
+    Labels use the matched route template (e.g. /api/rooms/{room_id}) rather than
+    the raw path, so cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, scope["method"], route, status[0])
@@ -0,0 +1,88 @@
+"""Lightweight per-request tracing.
+
+A trace is opened per HTTP request (by TracingMiddleware) and per WebSocket
+message; code on the path wraps its stages in span("name"). The active trace
+travels in a ContextVar, so spans work across awaits and dependencies without
+being passed around, and cost a single ContextVar lookup when no trace is open.
+Requests slower than SLOW_REQUEST_MS are logged with their time per stage.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from src.core.config import SLOW_REQUEST_MS
+
+logger = logging.getLogger("devsync.slow")
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("devsync_trace", default=None)
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {}  # stage name -> seconds (summed if repeated)
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def breakdown(self, total: float) -> str:
+        parts = [f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.spans.items()]
+        other = total - sum(self.spans.values())
+        if other > 0:
+            parts.append(f"other={other * 1000:.1f}ms")
+        return " ".join(parts)
+
+    def finish(self):
+        total = time.perf_counter() - self.start
+        if total * 1000 >= SLOW_REQUEST_MS:
+            logger.warning("Slow %s took %.1fms: %s", self.name, total * 1000, self.breakdown(total))
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def trace(name: str):
+    """Open a trace for one request or message; nested traces are not supported."""
+    t = Trace(name)
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+        t.finish()
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage of the current trace. A no-op outside a trace."""
+    t = _current.get()
+    if t is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        t.add(name, time.perf_counter() - start)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a trace per HTTP request, named after its route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with trace(scope["method"]) as t:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                t.name = f'{scope["method"]} {getattr(scope.get("route"), "path", scope["path"])}'
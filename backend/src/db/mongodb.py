@@ -1,16 +1,190 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from src.core.config import MONGO_DETAILS
-import gspread
-from google.oauth2.service_account import Credentials
 import os
+import threading
 
-client = AsyncIOMotorClient(MONGO_DETAILS)
-db = client.devsync_mongo
+from pymongo import monitoring
+from src.core.config import (
+    MONGO_DETAILS, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_WRITE_CONCERN, MONGO_WRITE_TIMEOUT_MS, MONGO_READ_PREFERENCE,
+)
+from src.core.metrics import MONGO_COMMAND_DURATION, gauge
 
-# You can add helper functions for database operations here if needed 
+class CommandMetricsListener(monitoring.CommandListener):
+    """Feeds MongoDB command round-trip times into the metrics registry."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, event.command_name, "ok")
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, event.command_name, "error")
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks open, checked-out and waiting connections across the client's pools."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+
+    def _add(self, field: str, amount: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"open": self.open, "in_use": self.in_use, "waiting": self.waiting}
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_check_out_started(self, event):
+        self._add("waiting", 1)
+
+    def connection_checked_out(self, event):
+        self._add("waiting", -1)
+        self._add("in_use", 1)
+
+    def connection_check_out_failed(self, event):
+        self._add("waiting", -1)
+
+    def connection_checked_in(self, event):
+        self._add("in_use", -1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+def client_options() -> dict:
+    """Keyword arguments for the Motor client, built from config."""
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    optional = {
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "wTimeoutMS": MONGO_WRITE_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+    }
+    options.update({k: v for k, v in optional.items() if v is not None})
+    if MONGO_WRITE_CONCERN:
+        options["w"] = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+    return options
+
+
+# The client is owned by the app lifespan (connect_client/close_client), so each
+# gunicorn worker builds its own after fork; PyMongo clients are not fork-safe.
+_client = None
+_pool_stats = None
+_database = None
+
+
+def connect_client():
+    """Create the Motor client if there is none yet. Connections are opened lazily by the driver."""
+    global _client, _pool_stats
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        _pool_stats = PoolStatsListener()
+        _client = AsyncIOMotorClient(
+            MONGO_DETAILS, event_listeners=[CommandMetricsListener(), _pool_stats], **client_options()
+        )
+    return _client
+
+
+def get_client():
+    """The Motor client; created on first use outside the app (scripts, shells)."""
+    return connect_client()
+
+
+def get_database():
+    return _database if _database is not None else get_client().devsync_mongo
+
+
+def use_database(database):
+    """Serve db from another database object, e.g. an in-memory stand-in for benchmarks."""
+    global _database
+    _database = database
+
+
+def close_client():
+    global _client, _pool_stats
+    if _client is not None:
+        _client.close()
+        _client = None
+        _pool_stats = None
+
+
+def _forget_client_after_fork():
+    # A client inherited from the parent (e.g. gunicorn --preload) must not be reused
+    global _client, _pool_stats
+    _client = None
+    _pool_stats = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_client_after_fork)
+
+
+def pool_stats() -> dict:
+    """Connection pool utilization for this worker, or None before the client exists."""
+    if _pool_stats is None:
+        return None
+    stats = _pool_stats.snapshot()
+    stats["max_size"] = MONGO_MAX_POOL_SIZE
+    stats["utilization"] = stats["in_use"] / MONGO_MAX_POOL_SIZE if MONGO_MAX_POOL_SIZE else 0.0
+    return stats
+
+
+def _collect_pool_gauge():
+    stats = pool_stats()
+    if stats is None:
+        return []
+    return [(("open",), stats["open"]), (("in_use",), stats["in_use"]), (("waiting",), stats["waiting"])]
+
+
+gauge("devsync_mongo_pool_connections", "MongoDB pool connections by state.", ("state",), collect=_collect_pool_gauge)
+
+
+class _LazyDatabase:
+    """Module-level handle that resolves to the current database on each access,
+    so importing this module opens no connections and `from ... import db` keeps working."""
+
+    def __getattr__(self, name):
+        return getattr(get_database(), name)
+
+    def __getitem__(self, name):
+        return get_database()[name]
+
+
+db = _LazyDatabase()
+
+# You can add helper functions for database operations here if needed
 
 def get_feedback_collection():
-    return db["feedback"] 
+    return db["feedback"]
 
 # Use environment variable for the credentials file
 GSHEET_CREDENTIALS_FILE = os.getenv('GSHEET_CREDENTIALS_FILE')
@@ -18,18 +192,32 @@ if not GSHEET_CREDENTIALS_FILE:
     GSHEET_CREDENTIALS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'google-credentials.json')
 GSHEET_SHEET_NAME = 'DevSync Feedback'
 
+_worksheet = None
+_worksheet_lock = threading.Lock()
+
+
+def _get_worksheet():
+    """The feedback worksheet; gspread and google-auth are imported and authorized on first use."""
+    global _worksheet
+    with _worksheet_lock:
+        if _worksheet is None:
+            import gspread
+            from google.oauth2.service_account import Credentials
+            print('Looking for credentials at:', GSHEET_CREDENTIALS_FILE)
+            print('File exists:', os.path.exists(GSHEET_CREDENTIALS_FILE))
+            # Authenticate and open the sheet
+            creds = Credentials.from_service_account_file(GSHEET_CREDENTIALS_FILE, scopes=[
+                'https://www.googleapis.com/auth/spreadsheets',
+                'https://www.googleapis.com/auth/drive',
+            ])
+            gc = gspread.authorize(creds)
+            sh = gc.open(GSHEET_SHEET_NAME)
+            _worksheet = sh.sheet1  # Use the first worksheet
+        return _worksheet
+
+
 def append_feedback_to_gsheet(feedback: dict):
-    print('Current working directory:', os.getcwd())
-    print('Looking for credentials at:', GSHEET_CREDENTIALS_FILE)
-    print('File exists:', os.path.exists(GSHEET_CREDENTIALS_FILE))
-    # Authenticate and open the sheet
-    creds = Credentials.from_service_account_file(GSHEET_CREDENTIALS_FILE, scopes=[
-        'https://www.googleapis.com/auth/spreadsheets',
-        'https://www.googleapis.com/auth/drive',
-    ])
-    gc = gspread.authorize(creds)
-    sh = gc.open(GSHEET_SHEET_NAME)
-    worksheet = sh.sheet1  # Use the first worksheet
+    worksheet = _get_worksheet()
     # Prepare row (order: name, org, message, social, timestamp)
     from datetime import datetime
     row = [
@@ -39,4 +227,4 @@ def append_feedback_to_gsheet(feedback: dict):
         feedback.get('social', ''),
         datetime.utcnow().isoformat()
     ]
-    worksheet.append_row(row) 
\ No newline at end of file
+    worksheet.append_row(row)
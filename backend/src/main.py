@@ -1,9 +1,12 @@
+import asyncio
+import logging
 import os
 import sys
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Add src to path to allow for absolute imports
@@ -11,8 +14,79 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.api import rooms
 from src.api import requests as api_requests
+from src.api import metrics as api_metrics
+from src.api import admin
+from src.api import bulk
+from src.api import files
+from src.api import health
+from src.api import notifications
+from src.api import internal
+from src.api import search
+from src.core.firebase_admin import get_firebase_app, close_firebase_app
+from src.core.metrics import MetricsMiddleware
+from src.core.tracing import TracingMiddleware
+from src.db.mongodb import connect_client, close_client
+from src.services.activity_tracker import activity_tracker
+from src.services.diagnostics import diagnostics
+from src.services.notification_inbox import notification_inbox
+from src.services.room_files import room_files
+from src.services.room_search import room_search
+from src.services.room_registry import room_registry, RoomMoved
+from src.services.room_router import room_router, RoomAffinityMiddleware, NOT_OWNER_HEADER
+from src.services.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up_firebase():
+    """Initialize the Admin SDK off the event loop once serving, so the first request doesn't pay for it."""
+    try:
+        await asyncio.to_thread(get_firebase_app)
+    except Exception:
+        logger.exception("Firebase Admin initialization failed; auth calls will retry it")
+
+
+async def _ensure_indexes():
+    try:
+        await notification_inbox.ensure_indexes()
+        await room_files.ensure_indexes()
+        await room_search.ensure_indexes()
+    except Exception:
+        logger.exception("Failed to create indexes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # External clients are built here or on first use, never at import: the
+    # Motor client is created per worker after fork, Firebase warms up in a thread
+    connect_client()
+    warm_up = asyncio.create_task(_warm_up_firebase())
+    indexes = asyncio.create_task(_ensure_indexes())
+    activity_tracker.start()
+    room_registry.start()
+    await room_router.start(app)
+    yield
+    await room_router.stop()
+    await diagnostics.stop()
+    await room_registry.stop()
+    await activity_tracker.stop()
+    await manager.drain_notifications()
+    await asyncio.gather(warm_up, indexes)
+    close_firebase_app()
+    close_client()
+
+
+app = FastAPI(title="Collaborative Code Editor", lifespan=lifespan)
+
+
+@app.exception_handler(RoomMoved)
+async def room_moved(request, exc):
+    # An edit to a room being handed to another worker; the retry is routed to the new owner
+    return JSONResponse(
+        {"detail": "Room is moving to another worker, retry"}, status_code=503,
+        headers={"retry-after": "1", NOT_OWNER_HEADER.decode(): "1"}
+    )
 
-app = FastAPI(title="Collaborative Code Editor")
 
 # CORS middleware
 app.add_middleware(
@@ -22,10 +96,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+# Outermost, so requests proxied to another worker are measured and traced there
+app.add_middleware(RoomAffinityMiddleware)
 
 # Include API routers
 app.include_router(rooms.router)
+app.include_router(bulk.router)
+app.include_router(files.router)
+app.include_router(search.router)
 app.include_router(api_requests.router)
+app.include_router(notifications.router)
+app.include_router(api_metrics.router)
+app.include_router(admin.router)
+app.include_router(health.router)
+app.include_router(internal.router)
 
 # Serve static files from the 'static' directory
 static_folder_path = os.path.join(os.path.dirname(__file__), 'static')
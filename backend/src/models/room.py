@@ -13,16 +13,22 @@ class Room(BaseModel):
     
 class RoomCreate(BaseModel):
     name: str
+    language: str = "python"
 
 class RoomUpdate(BaseModel):
     name: Optional[str] = None
+    language: Optional[str] = None
 
 class CodeUpdate(BaseModel):
     code: str
 
+class FileWrite(BaseModel):
+    content: str
+
 class ExecuteCode(BaseModel):
-    code: str
+    code: Optional[str] = None  # defaults to the room's current entry file
     inputs: Optional[List[str]] = None
+    language: Optional[str] = None  # defaults to the room's language
 
 class ShareRequest(BaseModel):
     share_with_uid: str
@@ -30,6 +36,23 @@ class ShareRequest(BaseModel):
 class ShareByEmailRequest(BaseModel):
     email: str
 
+class BulkMembershipRequest(BaseModel):
+    """Share many rooms with, or remove many users from, in one request. Users are given by email and/or UID."""
+    room_ids: List[str] = Field(..., min_length=1, max_length=100)
+    emails: List[str] = Field(default_factory=list, max_length=500)
+    uids: List[str] = Field(default_factory=list, max_length=500)
+
+class BulkDeleteRequest(BaseModel):
+    room_ids: List[str] = Field(..., min_length=1, max_length=100)
+
+class RoomReload(BaseModel):
+    """Rooms whose membership changed on another worker (internal)."""
+    room_ids: List[str]
+
+class RoomDiscard(BaseModel):
+    """Rooms another worker is about to delete (internal)."""
+    room_ids: List[str]
+
 class JoinRequest(BaseModel):
     room_id: str
     requester_uid: str
@@ -41,6 +64,9 @@ class JoinRequest(BaseModel):
 class JoinRequestInDB(JoinRequest):
     id: str = Field(alias="_id")
 
+class NotificationAck(BaseModel):
+    cursor: int = Field(..., ge=0)  # seq of the newest notification the client has seen
+
 class ChatMessage(BaseModel):
     user: str
     text: str
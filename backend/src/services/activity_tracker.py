@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from bson import ObjectId, errors as bson_errors
+from pymongo import UpdateOne
+
+from src.core.config import ACTIVITY_FLUSH_INTERVAL
+from src.db.mongodb import db
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Buffers room last_activity touches in memory and flushes them in batches.
+
+    Busy rooms touch several times per second; only the latest timestamp per room
+    is kept, and all pending rooms are written with one bulk_write per interval.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.pending: Dict[str, datetime] = {}   # room_id -> latest touch not yet flushed
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, room_id: str, when: Optional[datetime] = None):
+        self.pending[room_id] = when or datetime.now(timezone.utc)
+
+    def last_touch(self, room_id: str) -> Optional[datetime]:
+        """Latest touch that has not reached the database yet, if any."""
+        return self.pending.get(room_id)
+
+    def forget(self, room_id: str):
+        self.pending.pop(room_id, None)
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        operations = []
+        for room_id, when in batch.items():
+            try:
+                obj_id = ObjectId(room_id)
+            except bson_errors.InvalidId:
+                continue
+            # $max keeps concurrent flushes from several workers from moving the clock back
+            operations.append(UpdateOne({"_id": obj_id}, {"$max": {"last_activity": when}}))
+        if not operations:
+            return
+        try:
+            await db.rooms.bulk_write(operations, ordered=False)
+        except asyncio.CancelledError:
+            # Cancelled by stop() mid-write; its final flush writes the batch again ($max makes that safe)
+            self._restore(batch)
+            raise
+        except Exception:
+            logger.exception("Failed to flush room activity")
+            self._restore(batch)
+
+    def _restore(self, batch: Dict[str, datetime]):
+        """Put an unwritten batch back, unless a newer touch arrived meanwhile."""
+        for room_id, when in batch.items():
+            if room_id not in self.pending or self.pending[room_id] < when:
+                self.pending[room_id] = when
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def is_active_since(self, room_id: str, cutoff: datetime) -> bool:
+        when = self.pending.get(room_id)
+        return when is not None and when >= cutoff
+
+
+activity_tracker = ActivityTracker(ACTIVITY_FLUSH_INTERVAL)
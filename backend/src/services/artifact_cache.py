@@ -0,0 +1,91 @@
+import hashlib
+import os
+import threading
+import uuid
+from typing import List, Optional
+
+from src.core.config import EXECUTION_CACHE_DIR, EXECUTION_CACHE_MAX_BYTES
+
+
+class ArtifactCache:
+    """On-disk LRU cache for compiled binaries.
+
+    Entries are keyed by a hash of the language, compiler flags and source, so
+    re-running unchanged code (or running it against many test cases) only
+    compiles once. Recency is tracked through file mtimes, which keeps the cache
+    shared between worker processes without any extra bookkeeping.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(language: str, source: str, flags: List[str]) -> str:
+        digest = hashlib.sha256()
+        digest.update(language.encode())
+        digest.update(b"\0")
+        digest.update("\0".join(flags).encode())
+        digest.update(b"\0")
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def staging_path(self, key: str) -> str:
+        """Where a compiler should write its output before it is committed with put().
+
+        Unique per call, since identical sources can be compiling concurrently in the same worker.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached artifact path and mark it as recently used."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, built_path: str) -> str:
+        """Move a freshly built artifact into the cache and evict if over budget."""
+        path = self.path_for(key)
+        # os.replace is atomic, so concurrent workers compiling the same key are harmless
+        os.replace(built_path, path)
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str):
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue  # another worker's build in progress
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+artifact_cache = ArtifactCache(EXECUTION_CACHE_DIR, EXECUTION_CACHE_MAX_BYTES)
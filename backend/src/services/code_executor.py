@@ -1,68 +1,129 @@
-import subprocess
-import sys
 import tempfile
 import os
+import time
+from typing import Dict, List, Optional
 
-async def execute_python_code(code: str):
-    """Executes Python code in a sandboxed environment."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-        f.write(code)
-        temp_file = f.name
-    
-    try:
-        result = subprocess.run(
-            [sys.executable, temp_file],
-            capture_output=True,
-            text=True,
-            timeout=10  # 10 second timeout
+from src.core.metrics import EXECUTIONS_IN_PROGRESS, EXECUTION_DURATION
+from src.core.tracing import span
+from src.services.artifact_cache import artifact_cache
+from src.services.language_runners import get_runner, LanguageRunner
+from src.services.sandbox import ResourceLimits, run_sandboxed, LIMIT_TIMEOUT
+
+# Compilers get more headroom than user programs but are still bounded
+COMPILE_LIMITS = ResourceLimits(
+    timeout=30,
+    cpu_seconds=30,
+    memory_bytes=1024 * 1024 * 1024,
+    max_output_bytes=256 * 1024,
+    max_file_bytes=256 * 1024 * 1024,
+)
+
+
+def _error(message: str):
+    return {"stdout": "", "stderr": message, "returncode": 1, "limit_exceeded": None, "truncated": False}
+
+
+def _write_workspace(runner: LanguageRunner, code: str, files: Dict[str, str], workdir: str) -> str:
+    """Write the entry file and the room's other files into workdir. Returns the entry file's path."""
+    with span("write_workspace"):
+        for path, content in files.items():
+            file_path = os.path.join(workdir, *path.split("/"))
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w") as f:
+                f.write(content)
+        source_path = os.path.join(workdir, "main" + runner.suffix)
+        with open(source_path, "w") as f:
+            f.write(code)
+    return source_path
+
+
+def _workspace_source(code: str, files: Dict[str, str]) -> str:
+    """Everything a build depends on, as one string for the cache key; just the code for a single file."""
+    parts = [code]
+    for path in sorted(files):
+        parts.extend(("\0", path, "\0", files[path]))
+    return "".join(parts)
+
+
+async def _build(runner: LanguageRunner, code: str, files: Dict[str, str], workdir: str):
+    """Compile the workspace (or reuse the cached binary). Returns (binary_path, error_result)."""
+    key = artifact_cache.make_key(runner.language, _workspace_source(code, files), [runner.compiler, *runner.flags])
+    cached = artifact_cache.get(key)
+    if cached:
+        return cached, None
+
+    source_path = _write_workspace(runner, code, files, workdir)
+    extra_sources = [
+        os.path.join(workdir, *path.split("/")) for path in sorted(files) if path.endswith(runner.source_suffixes)
+    ]
+    staging_path = artifact_cache.staging_path(key)
+    start = time.perf_counter()
+    with span("compile"):
+        result = await run_sandboxed(
+            runner.compile_command(source_path, staging_path, extra_sources), workdir, limits=COMPILE_LIMITS
         )
-        
-        return {
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "returncode": result.returncode
-        }
-        
-    except subprocess.TimeoutExpired:
-        return {
-            "stdout": "",
-            "stderr": "Error: Code execution timed out (10 seconds limit)",
-            "returncode": 1
-        }
-    finally:
-        os.unlink(temp_file)
+    failed = result["returncode"] != 0 or result["limit_exceeded"]
+    EXECUTION_DURATION.observe(time.perf_counter() - start, runner.language, "compile_error" if failed else "compile")
+    if failed:
+        if os.path.exists(staging_path):
+            os.unlink(staging_path)
+        if result["limit_exceeded"] == LIMIT_TIMEOUT:
+            result["stderr"] = f"Error: Compilation timed out ({COMPILE_LIMITS.timeout:g} seconds limit)"
+        result["returncode"] = result["returncode"] or 1
+        return None, result
+    return artifact_cache.put(key, staging_path), None
+
+
+async def _prepare(runner: LanguageRunner, code: str, files: Dict[str, str], workdir: str):
+    """Returns (command, error_result) for running code with the given runner."""
+    if runner.is_compiled:
+        binary, error = await _build(runner, code, files, workdir)
+        if error:
+            return None, error
+        return runner.run_command(binary), None
+    source_path = _write_workspace(runner, code, files, workdir)
+    return runner.run_command(source_path), None
+
+
+async def _run(runner: LanguageRunner, command: List[str], workdir: str, input_str: Optional[str] = None):
+    limits = ResourceLimits(limit_address_space=runner.limit_address_space)
+    start = time.perf_counter()
+    with span("run"):
+        result = await run_sandboxed(command, workdir, input_str, limits)
+    outcome = result["limit_exceeded"] or ("ok" if result["returncode"] == 0 else "error")
+    EXECUTION_DURATION.observe(time.perf_counter() - start, runner.language, outcome)
+    return result
+
 
-# New: Execute code with custom input
-async def execute_python_code_with_input(code: str, input_str: str):
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-        f.write(code)
-        temp_file = f.name
+async def execute_code(code: str, language: str = "python", input_str: Optional[str] = None,
+                       files: Optional[Dict[str, str]] = None):
+    """Executes code in the given language in a sandboxed environment."""
+    results = await execute_code_multiple(code, language, [input_str], files)
+    return results[0]
+
+
+async def execute_code_multiple(code: str, language: str, inputs: List[Optional[str]],
+                                files: Optional[Dict[str, str]] = None):
+    """Executes code once per input. Compiled languages are built only once.
+
+    code is the entry file; files ({path: content}) are written beside it, so
+    it can import or include them, and compiled languages build them too.
+    Each run is bounded by the sandbox limits (wall clock, CPU, memory, processes,
+    output bytes); a result's "limit_exceeded" names the limit that stopped it.
+    """
+    files = files or {}
+    runner = get_runner(language)
+    if runner is None:
+        return [_error(f"Error: Unsupported language '{language}'") for _ in inputs]
+    if not runner.is_available():
+        return [_error(f"Error: No {runner.language} toolchain is installed on the server") for _ in inputs]
+
+    EXECUTIONS_IN_PROGRESS.inc()
     try:
-        result = subprocess.run(
-            [sys.executable, temp_file],
-            input=input_str,
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        return {
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "returncode": result.returncode
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            "stdout": "",
-            "stderr": "Error: Code execution timed out (10 seconds limit)",
-            "returncode": 1
-        }
+        with tempfile.TemporaryDirectory(prefix="devsync-run-") as workdir:
+            command, error = await _prepare(runner, code, files, workdir)
+            if error:
+                return [error for _ in inputs]
+            return [await _run(runner, command, workdir, input_str) for input_str in inputs]
     finally:
-        os.unlink(temp_file)
-
-# New: Execute code for multiple test cases
-async def execute_python_code_multiple(code: str, inputs: list):
-    results = []
-    for input_str in inputs:
-        result = await execute_python_code_with_input(code, input_str)
-        results.append(result)
-    return results 
\ No newline at end of file
+        EXECUTIONS_IN_PROGRESS.dec()
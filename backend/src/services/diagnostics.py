@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from src.core.config import DIAGNOSTICS_ENABLED, DIAGNOSTICS_DEBOUNCE, DIAGNOSTICS_WORKERS, DIAGNOSTICS_MAX_BYTES
+from src.core.metrics import DIAGNOSTICS_DURATION, DIAGNOSTICS_BLOCKS
+from src.services import python_diagnostics
+from src.services.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+# Whole-file results by content hash, and the last result sent per (room_id, path)
+RESULT_CACHE_SIZE = 256
+LATEST_SIZE = 1024
+
+
+class DiagnosticsService:
+    """Computes diagnostics for edited Python files off the event loop.
+
+    Edits are debounced per file: the first edit schedules a run after the
+    debounce interval, later edits just replace the pending content, so a busy
+    file is analyzed at most once per interval. Analysis runs in a small
+    process pool (python_diagnostics reparses only changed top-level blocks and
+    keeps its block cache in the worker), and identical content is answered
+    from a cache by hash. Results go out as "diagnostics" frames to the sockets
+    that have the file open, and are dropped if a newer edit arrived meanwhile.
+    """
+
+    def __init__(self, enabled: bool, debounce: float, workers: int, max_bytes: int):
+        self.enabled = enabled
+        self.debounce = debounce
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self._pending: Dict[Tuple[str, str], Tuple[str, Optional[int], bool]] = {}
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._results: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._latest: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def supports(path: str) -> bool:
+        return path.endswith(".py")
+
+    def schedule(self, room_id: str, path: str, content: str, version: Optional[int] = None, entry: bool = False):
+        """Queue diagnostics for a file's new content. entry marks the room's entry file,
+        whose diagnostics also go to clients that never subscribed to files."""
+        if not self.enabled or not self.supports(path):
+            return
+        key = (room_id, path)
+        self._pending[key] = (content, version, entry)
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._run(key))
+
+    def latest(self, room_id: str, path: str) -> Optional[dict]:
+        """The last diagnostics frame sent for a file, for clients that open it later."""
+        return self._latest.get((room_id, path))
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the event loop process has Motor and executor threads running
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def analyze(self, content: str) -> Optional[List[dict]]:
+        """Diagnostics for content, from the cache or a pool worker. None if it was not analyzed."""
+        if len(content.encode()) > self.max_bytes:
+            return None
+        digest = hashlib.sha1(content.encode()).hexdigest()
+        cached = self._results.get(digest)
+        if cached is not None:
+            self._results.move_to_end(digest)
+            DIAGNOSTICS_DURATION.observe(0, "cached")
+            return cached
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(), python_diagnostics.analyze, content)
+        except BrokenProcessPool:
+            # A worker died (e.g. on pathological input); start a fresh pool next time
+            logger.warning("Diagnostics worker pool broke; restarting it")
+            await self._shutdown_pool()
+            DIAGNOSTICS_DURATION.observe(time.perf_counter() - start, "error")
+            return None
+        DIAGNOSTICS_DURATION.observe(time.perf_counter() - start, "ok")
+        DIAGNOSTICS_BLOCKS.inc("parsed", amount=result["parsed"])
+        DIAGNOSTICS_BLOCKS.inc("cached", amount=result["blocks"] - result["parsed"])
+        self._results[digest] = result["diagnostics"]
+        if len(self._results) > RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return result["diagnostics"]
+
+    async def _run(self, key: Tuple[str, str]):
+        room_id, path = key
+        try:
+            while key in self._pending:
+                await asyncio.sleep(self.debounce)
+                content, version, entry = self._pending.pop(key)
+                diagnostics = await self.analyze(content)
+                if diagnostics is None or key in self._pending:
+                    continue  # too large, failed, or already stale
+                message = {"type": "diagnostics", "path": path, "version": version, "diagnostics": diagnostics}
+                self._latest[key] = message
+                self._latest.move_to_end(key)
+                if len(self._latest) > LATEST_SIZE:
+                    self._latest.popitem(last=False)
+                await manager.broadcast_to_file(json.dumps(message), room_id, path, unsubscribed=entry)
+        except Exception:
+            logger.exception("Diagnostics failed for %s in room %s", path, room_id)
+        finally:
+            # Removed here rather than in a done callback, so an edit arriving right after starts a new run
+            self._tasks.pop(key, None)
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._pending.clear()
+        await self._shutdown_pool()
+
+    async def _shutdown_pool(self):
+        """Stop the pool and wait for its processes, so no child outlives the worker."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+
+
+diagnostics = DiagnosticsService(DIAGNOSTICS_ENABLED, DIAGNOSTICS_DEBOUNCE, DIAGNOSTICS_WORKERS, DIAGNOSTICS_MAX_BYTES)
@@ -0,0 +1,117 @@
+import shutil
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.core.config import EXECUTION_MEMORY_BYTES
+
+
+class LanguageRunner:
+    """Describes how to run source code for one language.
+
+    Interpreted languages run the source file directly. Compiled languages set
+    ``compiler`` and get a build step whose output is cached by the executor.
+    """
+
+    language: str = ""
+    suffix: str = ""
+    compiler: Optional[str] = None
+    flags: List[str] = []
+    # Workspace files with these suffixes are compiled together with the entry file
+    source_suffixes: Tuple[str, ...] = ()
+    welcome_code: str = ""
+    # False for runtimes that cannot start under RLIMIT_AS and cap their own heap instead
+    limit_address_space: bool = True
+
+    @property
+    def is_compiled(self) -> bool:
+        return self.compiler is not None
+
+    def is_available(self) -> bool:
+        return shutil.which(self.executable()) is not None
+
+    def executable(self) -> str:
+        return self.compiler
+
+    def compile_command(self, source_path: str, output_path: str, extra_sources: Sequence[str] = ()) -> List[str]:
+        return [self.compiler, *self.flags, "-o", output_path, source_path, *extra_sources]
+
+    def run_command(self, path: str) -> List[str]:
+        """Command for a source file (interpreted) or a built binary (compiled)."""
+        return [path]
+
+
+class PythonRunner(LanguageRunner):
+    language = "python"
+    suffix = ".py"
+    welcome_code = "# Welcome to the collaborative Python editor!\\nprint('Hello, World!')"
+
+    def executable(self) -> str:
+        return sys.executable
+
+    def run_command(self, path: str) -> List[str]:
+        return [sys.executable, path]
+
+
+class JavaScriptRunner(LanguageRunner):
+    language = "javascript"
+    suffix = ".js"
+    welcome_code = "// Welcome to the collaborative JavaScript editor!\nconsole.log('Hello, World!');\n"
+    limit_address_space = False  # V8 reserves its code range up front
+
+    def executable(self) -> str:
+        return "node"
+
+    def run_command(self, path: str) -> List[str]:
+        heap_mb = max(EXECUTION_MEMORY_BYTES // (1024 * 1024), 16)
+        return ["node", f"--max-old-space-size={heap_mb}", path]
+
+
+class CRunner(LanguageRunner):
+    language = "c"
+    suffix = ".c"
+    compiler = "gcc"
+    flags = ["-O2", "-std=c11", "-pipe"]
+    source_suffixes = (".c",)
+    welcome_code = (
+        "// Welcome to the collaborative C editor!\n"
+        "#include <stdio.h>\n\n"
+        "int main(void) {\n"
+        "    printf(\"Hello, World!\\n\");\n"
+        "    return 0;\n"
+        "}\n"
+    )
+
+    def compile_command(self, source_path: str, output_path: str, extra_sources: Sequence[str] = ()) -> List[str]:
+        # -lm must follow the source files for the linker to resolve math symbols
+        return [*super().compile_command(source_path, output_path, extra_sources), "-lm"]
+
+
+class CppRunner(LanguageRunner):
+    language = "cpp"
+    suffix = ".cpp"
+    compiler = "g++"
+    flags = ["-O2", "-std=c++17", "-pipe"]
+    source_suffixes = (".cpp", ".cc", ".cxx")
+    welcome_code = (
+        "// Welcome to the collaborative C++ editor!\n"
+        "#include <iostream>\n\n"
+        "int main() {\n"
+        "    std::cout << \"Hello, World!\" << std::endl;\n"
+        "    return 0;\n"
+        "}\n"
+    )
+
+
+RUNNERS: Dict[str, LanguageRunner] = {
+    runner.language: runner
+    for runner in (PythonRunner(), JavaScriptRunner(), CRunner(), CppRunner())
+}
+
+
+def get_runner(language: str) -> Optional[LanguageRunner]:
+    return RUNNERS.get((language or "python").lower())
+
+
+def supported_languages() -> List[str]:
+    """Languages whose toolchain is installed on this worker."""
+    return [name for name, runner in RUNNERS.items() if runner.is_available()]
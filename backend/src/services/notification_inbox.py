@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+
+from src.core.config import NOTIFICATION_TTL_DAYS, NOTIFICATION_BATCH_SIZE
+from src.db.mongodb import db
+
+
+class NotificationInbox:
+    """Per-user notification inbox persisted in Mongo.
+
+    Each notification gets the next value of a per-user sequence, which doubles
+    as the read cursor: acknowledging cursor N removes everything up to N, and
+    whatever is left is delivered on the user's next authenticated connect.
+    Unacknowledged notifications expire after the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, batch_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size
+
+    async def ensure_indexes(self):
+        await db.notifications.create_index([("user_uid", ASCENDING), ("seq", ASCENDING)], unique=True)
+        await db.notifications.create_index("created_at", expireAfterSeconds=int(self.ttl_seconds))
+
+    async def record(self, user_uid: str, payload: dict) -> int:
+        """Append a notification to the user's inbox and return its sequence number."""
+        counter = await db.notification_counters.find_one_and_update(
+            {"_id": user_uid}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        seq = counter["seq"]
+        await db.notifications.insert_one({
+            "user_uid": user_uid,
+            "seq": seq,
+            "payload": payload,
+            "created_at": datetime.now(timezone.utc),
+        })
+        return seq
+
+    async def pending(self, user_uid: str, after: int = 0, limit: int = None) -> Tuple[List[dict], bool]:
+        """Unacknowledged notifications after the cursor, oldest first, and whether more remain."""
+        limit = limit or self.batch_size
+        cursor = db.notifications.find({"user_uid": user_uid, "seq": {"$gt": after}}).sort("seq", ASCENDING)
+        docs = await cursor.limit(limit + 1).to_list(length=limit + 1)
+        items = [{**doc["payload"], "seq": doc["seq"]} for doc in docs[:limit]]
+        return items, len(docs) > limit
+
+    async def ack(self, user_uid: str, cursor: int) -> int:
+        """Mark everything up to and including the cursor as read."""
+        result = await db.notifications.delete_many({"user_uid": user_uid, "seq": {"$lte": cursor}})
+        return result.deleted_count
+
+
+notification_inbox = NotificationInbox(NOTIFICATION_TTL_DAYS * 86400, NOTIFICATION_BATCH_SIZE)
@@ -0,0 +1,73 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being collected in this worker."""
+
+
+class SamplingProfiler:
+    """In-process sampling profiler.
+
+    A background thread snapshots the stack of the target thread (the event loop
+    by default) every interval and counts identical stacks. The result is in
+    collapsed-stack format ("outer;inner;leaf count" per line), which flamegraph
+    tools such as speedscope or flamegraph.pl read directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _sample(self, stop: threading.Event, interval: float, thread_id: Optional[int], counts: Counter):
+        own_id = threading.get_ident()
+        while not stop.wait(interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_id or (thread_id is not None and ident != thread_id):
+                    continue
+                counts[self._collapse(frame)] += 1
+
+    async def profile(self, seconds: float, interval: float = 0.005, all_threads: bool = False) -> dict:
+        """Sample for the given number of seconds and return the collapsed profile."""
+        with self._lock:
+            if self.running:
+                raise ProfilerBusy()
+            self.running = True
+        try:
+            counts: Counter = Counter()
+            stop = threading.Event()
+            target = None if all_threads else threading.get_ident()
+            sampler = threading.Thread(
+                target=self._sample, args=(stop, interval, target, counts), name="devsync-profiler", daemon=True
+            )
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                await asyncio.to_thread(sampler.join)
+            return {
+                "duration": time.perf_counter() - started,
+                "samples": sum(counts.values()),
+                "collapsed": "\n".join(f"{stack} {count}" for stack, count in counts.most_common()),
+            }
+        finally:
+            with self._lock:
+                self.running = False
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,192 @@
+"""Syntax errors and lint findings for Python source, reparsing only changed blocks.
+
+Runs inside the diagnostics worker processes, so it only uses the standard
+library. The source is split into top-level blocks (a statement at column 0
+plus everything indented under or continued from it) and each block is parsed
+on its own. Results are cached by the block's text, so an edit to one function
+only reparses that function; line numbers are shifted when results are combined.
+"""
+import ast
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+BLOCK_CACHE_SIZE = 4096
+
+# Brackets, quotes, comments, escapes and newlines: everything that decides where a block can end
+_TOKEN = re.compile(r'"""|\'\'\'|["\'#()\[\]{}\n]|\\(?:.|\n)')
+# Lines that continue the previous statement even at column 0
+_CONTINUATION = re.compile(r"(?:else|elif|except|finally)\b")
+
+_blocks: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def split_blocks(source: str) -> List[Tuple[int, str]]:
+    """Split source into (first line number, text) blocks that can each be parsed alone."""
+    starts = [0]
+    depth = 0
+    quote: Optional[str] = None
+    pos = 0
+    while True:
+        match = _TOKEN.search(source, pos)
+        if match is None:
+            break
+        token = match.group()
+        pos = match.end()
+        if quote is not None:
+            if token == quote or (token == "\n" and len(quote) == 1):
+                quote = None  # closed, or an unterminated one-line string
+            continue
+        if token in ('"""', "'''", '"', "'"):
+            quote = token
+        elif token == "#":
+            newline = source.find("\n", pos)
+            if newline == -1:
+                break
+            pos = newline  # the newline itself is the next token
+        elif token in "([{":
+            depth += 1
+        elif token in ")]}":
+            depth = max(depth - 1, 0)
+        elif token == "\n" and depth == 0:
+            line = source[pos:pos + 1]
+            if line and not line.isspace() and line != "#" and not _CONTINUATION.match(source, pos):
+                starts.append(pos)
+        # Backslash escapes and continuations are skipped whole
+
+    blocks: List[Tuple[int, str]] = []
+    line_number = 1
+    after_decorator = False
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(source)
+        text = source[start:end]
+        if after_decorator:
+            # A decorator belongs to the definition that follows it
+            blocks[-1] = (blocks[-1][0], blocks[-1][1] + text)
+        else:
+            blocks.append((line_number, text))
+        after_decorator = text.startswith("@")
+        line_number += text.count("\n")
+    return blocks
+
+
+def _diagnostic(line, column, end_line, end_column, severity, code, message) -> dict:
+    return {
+        "line": line, "column": column, "end_line": end_line or line, "end_column": end_column or column,
+        "severity": severity, "code": code, "message": message,
+    }
+
+
+class _Linter(ast.NodeVisitor):
+    def __init__(self):
+        self.findings: List[dict] = []
+        self.loads: Set[str] = set()
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load):
+            self.loads.add(node.id)
+
+    def visit_Constant(self, node: ast.Constant):
+        # Names listed in __all__ or used in string annotations count as used
+        if isinstance(node.value, str) and node.value.isidentifier():
+            self.loads.add(node.value)
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):
+        if node.type is None:
+            self.findings.append(_diagnostic(
+                node.lineno, node.col_offset + 1, node.lineno, node.col_offset + 7, "warning", "bare-except",
+                "Bare 'except:' also catches KeyboardInterrupt and SystemExit; use 'except Exception:'"
+            ))
+        self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare):
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(comparator, ast.Constant) and comparator.value is None:
+                suggestion = "is None" if isinstance(op, ast.Eq) else "is not None"
+                self.findings.append(_diagnostic(
+                    node.lineno, node.col_offset + 1, node.end_lineno, node.end_col_offset + 1, "warning",
+                    "compare-to-none", f"Comparison to None should use '{suggestion}'"
+                ))
+        self.generic_visit(node)
+
+
+def _imports(tree: ast.Module) -> List[dict]:
+    """Top-level imports of a block with the name each binds."""
+    found = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    continue
+                name = alias.asname or alias.name.split(".")[0]
+                found.append({"name": name, "line": node.lineno, "column": node.col_offset + 1,
+                              "end_line": node.end_lineno, "end_column": node.end_col_offset + 1})
+    return found
+
+
+def _analyze_block(text: str) -> dict:
+    """Diagnostics, top-level imports and used names for one block, with block-relative lines."""
+    try:
+        tree = ast.parse(text)
+    except SyntaxError as e:
+        return {"error": True, "imports": [], "loads": set(), "diagnostics": [_diagnostic(
+            e.lineno or 1, e.offset or 1, getattr(e, "end_lineno", None), getattr(e, "end_offset", None),
+            "error", "syntax-error", e.msg
+        )]}
+    except (ValueError, RecursionError, MemoryError) as e:
+        return {"error": True, "imports": [], "loads": set(), "diagnostics": [
+            _diagnostic(1, 1, None, None, "error", "syntax-error", str(e) or type(e).__name__)
+        ]}
+    linter = _Linter()
+    try:
+        linter.visit(tree)
+    except RecursionError:
+        pass
+    return {"error": False, "imports": _imports(tree), "loads": linter.loads, "diagnostics": linter.findings}
+
+
+def _cached_block(text: str) -> Tuple[dict, bool]:
+    key = hashlib.sha1(text.encode()).hexdigest()
+    result = _blocks.get(key)
+    if result is not None:
+        _blocks.move_to_end(key)
+        return result, True
+    result = _blocks[key] = _analyze_block(text)
+    if len(_blocks) > BLOCK_CACHE_SIZE:
+        _blocks.popitem(last=False)
+    return result, False
+
+
+def _shift(diagnostic: dict, offset: int) -> dict:
+    return {**diagnostic, "line": diagnostic["line"] + offset, "end_line": diagnostic["end_line"] + offset}
+
+
+def analyze(source: str) -> Dict[str, object]:
+    """Diagnostics for a whole file, plus how many blocks were reparsed vs. served from cache."""
+    diagnostics: List[dict] = []
+    imports: List[dict] = []
+    loads: Set[str] = set()
+    broken = False
+    parsed = 0
+    blocks = split_blocks(source)
+    for first_line, text in blocks:
+        result, cached = _cached_block(text)
+        parsed += not cached
+        offset = first_line - 1
+        diagnostics.extend(_shift(d, offset) for d in result["diagnostics"])
+        imports.extend(_shift(i, offset) for i in result["imports"])
+        loads |= result["loads"]
+        broken = broken or result["error"]
+    # With a syntax error somewhere, names used in the broken block are unknown
+    if not broken:
+        for item in imports:
+            if item["name"] not in loads:
+                diagnostics.append(_diagnostic(
+                    item["line"], item["column"], item["end_line"], item["end_column"], "warning",
+                    "unused-import", f"'{item['name']}' is imported but never used"
+                ))
+    diagnostics.sort(key=lambda d: (d["line"], d["column"]))
+    return {"diagnostics": diagnostics, "blocks": len(blocks), "parsed": parsed}
@@ -0,0 +1,89 @@
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+from src.core.config import ROOM_MAX_FILES, ROOM_MAX_FILE_BYTES
+from src.db.mongodb import db
+from src.services.language_runners import get_runner
+
+_SEGMENT = re.compile(r"[A-Za-z0-9._-]{1,100}")
+MAX_PATH_LENGTH = 255
+
+
+def entry_path(language: str) -> str:
+    """Path of a room's entry file, whose content is the room's `code` and which is what gets run."""
+    runner = get_runner(language)
+    return "main" + (runner.suffix if runner else "")
+
+
+def normalize_path(path: str) -> Optional[str]:
+    """A clean relative POSIX path ("src/util.py"), or None if the path is not acceptable."""
+    if not isinstance(path, str) or len(path) > MAX_PATH_LENGTH:
+        return None
+    segments = path.strip().strip("/").split("/")
+    if not all(_SEGMENT.fullmatch(segment) and segment not in (".", "..") for segment in segments):
+        return None
+    return "/".join(segments)
+
+
+class RoomFileStore:
+    """The files of a room besides its entry file, one Mongo document per file.
+
+    Files are loaded one at a time as clients open them, so a large project
+    costs nothing until a file is viewed, edited or the workspace is run.
+    """
+
+    def __init__(self, max_files: int, max_file_bytes: int):
+        self.max_files = max_files
+        self.max_file_bytes = max_file_bytes
+
+    async def ensure_indexes(self):
+        await db.room_files.create_index([("room_id", ASCENDING), ("path", ASCENDING)], unique=True)
+
+    async def list(self, room_id: str) -> List[dict]:
+        """Path, size, version and update time of every file, without contents."""
+        cursor = db.room_files.find(
+            {"room_id": room_id}, {"path": 1, "size": 1, "version": 1, "updated_at": 1}
+        ).sort("path", ASCENDING)
+        files = []
+        async for doc in cursor:
+            doc.pop("_id", None)
+            files.append(doc)
+        return files
+
+    async def load(self, room_id: str, path: str) -> Optional[dict]:
+        return await db.room_files.find_one({"room_id": room_id, "path": path})
+
+    async def load_all(self, room_id: str) -> Dict[str, str]:
+        """{path: content} for every stored file of the room."""
+        cursor = db.room_files.find({"room_id": room_id}, {"path": 1, "content": 1})
+        return {doc["path"]: doc.get("content", "") async for doc in cursor}
+
+    async def save(self, room_id: str, files: Dict[str, dict]):
+        """Write files ({path: {"content", "version"}}) in one bulk write, creating missing ones."""
+        now = datetime.now(timezone.utc)
+        await db.room_files.bulk_write([
+            UpdateOne(
+                {"room_id": room_id, "path": path},
+                {"$set": {
+                    "content": file["content"],
+                    "size": len(file["content"].encode()),
+                    "version": file["version"],
+                    "updated_at": now,
+                }},
+                upsert=True,
+            )
+            for path, file in files.items()
+        ], ordered=False)
+
+    async def delete(self, room_id: str, path: str) -> bool:
+        result = await db.room_files.delete_one({"room_id": room_id, "path": path})
+        return result.deleted_count == 1
+
+    async def delete_rooms(self, room_ids: Iterable[str]):
+        await db.room_files.delete_many({"room_id": {"$in": list(room_ids)}})
+
+
+room_files = RoomFileStore(ROOM_MAX_FILES, ROOM_MAX_FILE_BYTES)
@@ -0,0 +1,59 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from src.core.config import CATCHUP_BUFFER_SIZE
+
+
+class RoomHistory:
+    """Short in-memory ring buffer of recent versioned changes per room.
+
+    Lets a reconnecting client that reports its last seen version receive only
+    what it missed. Code updates carry the whole document, so only the newest
+    one is kept; older ones just hold their version to prove continuity.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.events: Dict[str, Deque[Tuple[int, Optional[dict]]]] = {}  # room_id -> (version, chat event or None)
+        self.latest_code: Dict[str, Tuple[int, dict]] = {}               # room_id -> newest code_update
+
+    def record(self, room_id: str, version: int, event: dict):
+        buffer = self.events.get(room_id)
+        if buffer is None:
+            buffer = self.events[room_id] = deque(maxlen=self.size)
+        if event.get("type") == "code_update":
+            buffer.append((version, None))
+            latest = self.latest_code.get(room_id)
+            if latest is None or latest[0] < version:
+                self.latest_code[room_id] = (version, event)
+        else:
+            buffer.append((version, event))
+
+    def since(self, room_id: str, last_version: int, current_version: int) -> Optional[List[dict]]:
+        """Events after last_version, or None when the buffer cannot cover the gap.
+
+        Coverage is checked version by version, so edits handled by another worker
+        (and therefore missing here) force a snapshot instead of a silent hole.
+        """
+        if last_version > current_version:
+            return None
+        if last_version == current_version:
+            return []
+        buffer = self.events.get(room_id)
+        if not buffer:
+            return None
+        missed = sorted(((v, e) for v, e in buffer if v > last_version), key=lambda item: item[0])
+        if [v for v, _ in missed] != list(range(last_version + 1, current_version + 1)):
+            return None
+        events = [e for _, e in missed if e is not None]
+        latest = self.latest_code.get(room_id)
+        if latest and latest[0] > last_version:
+            events.append(latest[1])
+        return events
+
+    def drop(self, room_id: str):
+        self.events.pop(room_id, None)
+        self.latest_code.pop(room_id, None)
+
+
+room_history = RoomHistory(CATCHUP_BUFFER_SIZE)
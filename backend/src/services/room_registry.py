@@ -0,0 +1,424 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Set
+
+from bson import ObjectId, errors as bson_errors
+
+from src.core.config import (
+    ROOM_IDLE_SECONDS, ROOM_MEMORY_BUDGET_BYTES, ROOM_FLUSH_INTERVAL, ROOM_CHAT_CACHE_SIZE,
+)
+from src.core.metrics import gauge
+from src.db.mongodb import db
+from src.services.room_files import room_files, entry_path
+from src.services.room_history import room_history
+from src.services.websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+
+class RoomMoved(Exception):
+    """The room is owned by another worker now, so this one takes no more edits to it."""
+
+
+class ActiveRoom:
+    """In-memory copy of a room's authoritative state while it is hot."""
+
+    def __init__(self, room_id: str, doc: dict, messages: List[dict], chat_cache_size: int):
+        self.room_id = room_id
+        self.name = doc.get("name", "")
+        self.owner = doc["owner"]
+        self.shared_with = list(doc.get("shared_with", []))
+        self.language = doc.get("language", "python")
+        self.code = doc.get("code", "")
+        self.version = doc.get("version", 0)
+        self.chat = deque(messages, maxlen=chat_cache_size)
+        # True while self.chat holds the room's entire chat history
+        self.chat_complete = True
+        self.pending_chat: List[dict] = []
+        self.code_dirty = False
+        # Set by every version bump, so rooms with only chat activity still persist their version
+        self.version_dirty = False
+        # Files other than the entry file that clients have opened: path -> {"content", "version"}
+        self.files: Dict[str, dict] = {}
+        self.dirty_files: Set[str] = set()
+        self.last_used = time.monotonic()
+        # Held while writing to Mongo, so clearing chat, deleting a file or
+        # discarding the room never races a write-back that would undo it
+        self.lock = asyncio.Lock()
+        self.discarded = False
+        # Set while the room is handed to another worker; edits are refused from then on
+        self.moving = False
+
+    def can_access(self, uid: str) -> bool:
+        return uid == self.owner or uid in self.shared_with
+
+    def size(self) -> int:
+        """Rough byte estimate used against the registry's memory budget."""
+        return (
+            len(self.code)
+            + sum(len(m.get("text", "")) + 64 for m in self.chat)
+            + sum(len(f["content"]) + 64 for f in self.files.values())
+        )
+
+    @property
+    def entry_path(self) -> str:
+        return entry_path(self.language)
+
+    @property
+    def dirty(self) -> bool:
+        return self.code_dirty or self.version_dirty or bool(self.pending_chat) or bool(self.dirty_files)
+
+    def as_doc(self) -> dict:
+        """The hot fields of a room, shaped like its Mongo document."""
+        return {
+            "_id": self.room_id,
+            "name": self.name,
+            "owner": self.owner,
+            "shared_with": list(self.shared_with),
+            "language": self.language,
+            "code": self.code,
+            "version": self.version,
+        }
+
+
+class RoomRegistry:
+    """Keeps active rooms in memory and hibernates them back to Mongo.
+
+    A room is loaded on first access (normally the first WebSocket connect) and
+    edits and chat are then applied in memory, with dirty state written back
+    every flush interval. Rooms without connections hibernate after the idle
+    period, and the coldest ones are evicted first when over the memory budget.
+    Assumes all traffic for a room reaches the same worker process, which
+    room_router ensures when several workers run.
+    """
+
+    def __init__(self, idle_seconds: float, memory_budget: int, flush_interval: float, chat_cache_size: int):
+        self.idle_seconds = idle_seconds
+        self.memory_budget = memory_budget
+        self.flush_interval = flush_interval
+        self.chat_cache_size = chat_cache_size
+        self.rooms: "OrderedDict[str, ActiveRoom]" = OrderedDict()  # least recently used first
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Whether this process may load a room; room_router narrows it to the rooms this worker owns
+        self.owns: Callable[[str], bool] = lambda room_id: True
+
+    def get(self, room_id: str) -> Optional[ActiveRoom]:
+        """The hot room, if it is loaded. Never touches the database."""
+        room = self.rooms.get(room_id)
+        if room is not None:
+            self._mark_used(room)
+        return room
+
+    async def acquire(self, room_id: str) -> Optional[ActiveRoom]:
+        """The hot room, loading it from Mongo if needed. None if it does not exist.
+
+        Raises RoomMoved for a room another worker owns.
+        """
+        if not self.owns(room_id):
+            raise RoomMoved(room_id)
+        room = self.get(room_id)
+        if room is not None:
+            return room
+        pending = self._loading.get(room_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._loading[room_id] = future
+        try:
+            room = await self._load(room_id)
+            if room is not None and not self.owns(room_id):
+                # The ring changed while loading
+                raise RoomMoved(room_id)
+            if room is not None:
+                self.rooms[room_id] = room
+                await self._enforce_budget()
+            future.set_result(room)
+            return room
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._loading[room_id]
+
+    async def _load(self, room_id: str) -> Optional[ActiveRoom]:
+        try:
+            obj_id = ObjectId(room_id)
+        except bson_errors.InvalidId:
+            return None
+        doc = await db.rooms.find_one({"_id": obj_id})
+        if not doc:
+            return None
+        chat_doc = await db.chat_messages.find_one({"room_id": room_id})
+        messages = chat_doc["messages"] if chat_doc and "messages" in chat_doc else []
+        room = ActiveRoom(room_id, doc, messages[-self.chat_cache_size:], self.chat_cache_size)
+        room.chat_complete = len(messages) <= self.chat_cache_size
+        return room
+
+    def _mark_used(self, room: ActiveRoom):
+        room.last_used = time.monotonic()
+        self.rooms.move_to_end(room.room_id)
+
+    @staticmethod
+    def _connected(room_id: str) -> bool:
+        return bool(manager.active_connections.get(room_id))
+
+    def _check_editable(self, room: ActiveRoom):
+        if room.moving or not self.owns(room.room_id):
+            raise RoomMoved(room.room_id)
+
+    def _next_version(self, room: ActiveRoom, event: dict) -> int:
+        """Bump the version, stamp it onto the event and keep it for reconnect catch-up."""
+        room.version += 1
+        room.version_dirty = True
+        event["version"] = room.version
+        room_history.record(room.room_id, room.version, event)
+        self._mark_used(room)
+        return room.version
+
+    def update_code(self, room: ActiveRoom, event: dict) -> int:
+        """Apply a code_update event ({"type": "code_update", "code": ...})."""
+        self._check_editable(room)
+        room.code = event["code"]
+        room.code_dirty = True
+        return self._next_version(room, event)
+
+    def add_chat(self, room: ActiveRoom, message: dict) -> int:
+        self._check_editable(room)
+        if len(room.chat) == room.chat.maxlen:
+            room.chat_complete = False
+        version = self._next_version(room, message)
+        room.chat.append(message)
+        room.pending_chat.append(message)
+        return version
+
+    async def clear_chat(self, room: ActiveRoom):
+        async with room.lock:
+            self._check_editable(room)
+            room.chat.clear()
+            room.chat_complete = True
+            room.pending_chat = []
+            # Buffered chat is stale now; bumping the version sends reconnecting clients a snapshot
+            room.version += 1
+            room.version_dirty = True
+            room_history.drop(room.room_id)
+            await db.chat_messages.update_one({"room_id": room.room_id}, {"$set": {"messages": []}}, upsert=True)
+
+    async def open_file(self, room: ActiveRoom, path: str) -> Optional[dict]:
+        """A file of the room ({"content", "version"}), loaded from Mongo on first open. None if missing."""
+        self._mark_used(room)
+        if path == room.entry_path:
+            return {"content": room.code, "version": room.version}
+        file = room.files.get(path)
+        if file is None:
+            doc = await room_files.load(room.room_id, path)
+            if doc is None:
+                return None
+            # An edit may have loaded the file while we were reading it
+            file = room.files.setdefault(path, {"content": doc.get("content", ""), "version": doc.get("version", 0)})
+            await self._enforce_budget()
+        return file
+
+    def update_file(self, room: ActiveRoom, path: str, content: str) -> int:
+        """Set a file's content (creating the file if needed) and return its new version."""
+        self._check_editable(room)
+        file = room.files.get(path)
+        if file is None:
+            file = room.files[path] = {"content": "", "version": 0}
+        file["content"] = content
+        file["version"] += 1
+        room.dirty_files.add(path)
+        self._mark_used(room)
+        return file["version"]
+
+    async def delete_file(self, room: ActiveRoom, path: str) -> bool:
+        """Delete a file from memory and Mongo. False if it existed in neither."""
+        async with room.lock:
+            self._check_editable(room)
+            unsaved = room.files.pop(path, None) is not None
+            room.dirty_files.discard(path)
+            return await room_files.delete(room.room_id, path) or unsaved
+
+    async def workspace(self, room_id: str) -> Dict[str, str]:
+        """{path: content} of every file besides the entry file, including edits not yet written back."""
+        files = await room_files.load_all(room_id)
+        room = self.rooms.get(room_id)
+        if room is not None:
+            files.update((path, file["content"]) for path, file in room.files.items())
+            files.pop(room.entry_path, None)
+        return files
+
+    async def chat_history(self, room: ActiveRoom) -> List[dict]:
+        """Full chat history: from memory when it all fits, else Mongo plus unflushed messages."""
+        if room.chat_complete:
+            return list(room.chat)
+        doc = await db.chat_messages.find_one({"room_id": room.room_id})
+        stored = doc["messages"] if doc and "messages" in doc else []
+        return stored + room.pending_chat
+
+    async def flush_room(self, room: ActiveRoom):
+        async with room.lock:
+            if not room.discarded:
+                await self._write_back(room)
+
+    async def _write_back(self, room: ActiveRoom):
+        # BaseException: state taken for a write cancelled on shutdown is put back for the final hibernate
+        if room.code_dirty or room.version_dirty:
+            code_dirty, room.code_dirty, room.version_dirty = room.code_dirty, False, False
+            # $max: a write that lands late never moves the stored version backwards
+            update = {"$max": {"version": room.version}}
+            if code_dirty:
+                update["$set"] = {"code": room.code}
+            try:
+                await db.rooms.update_one({"_id": ObjectId(room.room_id)}, update)
+            except BaseException:
+                room.code_dirty |= code_dirty
+                room.version_dirty = True
+                raise
+        if room.pending_chat:
+            batch, room.pending_chat = room.pending_chat, []
+            try:
+                await db.chat_messages.update_one(
+                    {"room_id": room.room_id},
+                    {"$push": {"messages": {"$each": batch}}},
+                    upsert=True
+                )
+            except BaseException:
+                room.pending_chat = batch + room.pending_chat
+                raise
+        if room.dirty_files:
+            paths, room.dirty_files = room.dirty_files, set()
+            # Copies, so edits made during the write are not marked clean
+            batch = {path: dict(room.files[path]) for path in paths if path in room.files}
+            try:
+                await room_files.save(room.room_id, batch)
+            except BaseException:
+                room.dirty_files |= set(batch)
+                raise
+
+    async def hibernate(self, room_id: str):
+        """Write the room back to Mongo and drop it from memory."""
+        room = self.rooms.get(room_id)
+        if room is None:
+            return
+        await self.flush_room(room)
+        # A new edit may have arrived while flushing; keep the room hot in that case
+        if not room.dirty and self.rooms.get(room_id) is room:
+            del self.rooms[room_id]
+            room_history.drop(room_id)
+
+    async def hand_off(self, room_id: str):
+        """Write the room back and drop it from memory because another worker owns it now.
+
+        Edits are refused from the start, so the write-back holds everything
+        the new owner needs. If it fails the room stays here, still refusing
+        edits, until a later hand-off succeeds.
+        """
+        room = self.rooms.get(room_id)
+        if room is None:
+            return
+        room.moving = True
+        await self.flush_room(room)
+        if self.rooms.get(room_id) is room:
+            del self.rooms[room_id]
+        room_history.drop(room_id)
+
+    def grant(self, room_id: str, uid: str):
+        """Mirror a shared_with $addToSet onto the hot room, if any."""
+        room = self.rooms.get(room_id)
+        if room is not None and uid not in room.shared_with:
+            room.shared_with.append(uid)
+
+    def revoke(self, room_id: str, uid: str):
+        """Mirror a shared_with $pull onto the hot room, if any."""
+        room = self.rooms.get(room_id)
+        if room is not None and uid in room.shared_with:
+            room.shared_with.remove(uid)
+
+    async def reload_members(self, room_id: str):
+        """Re-read shared_with for a hot room after another process changed it; drop the room if it was deleted."""
+        room = self.rooms.get(room_id)
+        if room is None:
+            return
+        doc = await db.rooms.find_one({"_id": ObjectId(room_id)}, {"shared_with": 1})
+        if doc is None:
+            await self.discard(room_id)
+        else:
+            room.shared_with = list(doc.get("shared_with", []))
+
+    async def discard(self, room_id: str):
+        """Forget a deleted room without writing it back.
+
+        Waits for a write-back already in progress, so call this before deleting
+        the room's documents, or that write could recreate them.
+        """
+        room = self.rooms.pop(room_id, None)
+        room_history.drop(room_id)
+        if room is not None:
+            room.discarded = True
+            async with room.lock:
+                pass
+
+    async def _enforce_budget(self):
+        total = sum(room.size() for room in self.rooms.values())
+        if total <= self.memory_budget:
+            return
+        # Coldest first; rooms with open sockets only go once idle rooms are exhausted
+        candidates = sorted(self.rooms.values(), key=lambda r: (self._connected(r.room_id), r.last_used))
+        for room in candidates:
+            if total <= self.memory_budget or len(self.rooms) <= 1:
+                break
+            size = room.size()
+            try:
+                await self.hibernate(room.room_id)
+            except Exception:
+                logger.exception("Failed to hibernate room %s", room.room_id)
+                continue
+            if room.room_id not in self.rooms:
+                total -= size
+
+    async def sweep(self):
+        """Flush dirty rooms, hibernate idle ones and enforce the memory budget."""
+        now = time.monotonic()
+        for room_id, room in list(self.rooms.items()):
+            try:
+                if not self._connected(room_id) and now - room.last_used >= self.idle_seconds:
+                    await self.hibernate(room_id)
+                elif room.dirty:
+                    await self.flush_room(room)
+            except Exception:
+                logger.exception("Failed to flush room %s", room_id)
+        await self._enforce_budget()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.sweep()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for room_id in list(self.rooms):
+            try:
+                await self.hibernate(room_id)
+            except Exception:
+                logger.exception("Failed to hibernate room %s", room_id)
+
+
+room_registry = RoomRegistry(ROOM_IDLE_SECONDS, ROOM_MEMORY_BUDGET_BYTES, ROOM_FLUSH_INTERVAL, ROOM_CHAT_CACHE_SIZE)
+
+gauge(
+    "devsync_active_rooms", "Rooms currently held in memory.",
+    collect=lambda: [((), len(room_registry.rooms))]
+)
@@ -0,0 +1,514 @@
+"""Room affinity across the worker processes of one host.
+
+Room state is held in memory by whichever worker serves the room (see
+room_registry), so every connection and request for a room has to reach the
+same worker. Each worker listens on a private Unix socket in ROOM_ROUTING_DIR
+and heartbeats by touching it; the live sockets form a consistent-hash ring
+that maps every room_id to its owning worker. Room traffic that lands on any
+other worker is proxied to the owner over its socket. When workers join or
+leave the ring changes: a worker stops taking edits to rooms it no longer owns,
+writes them back and only then closes their sockets with ROOM_MOVED_CODE, so
+clients reconnect to a new owner that loads the latest state.
+"""
+import asyncio
+import bisect
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from src.core.config import ROOM_ROUTING_DIR, ROOM_ROUTING_HEARTBEAT, ROOM_ROUTING_VNODES
+from src.core.metrics import counter
+from src.services.room_registry import room_registry
+from src.services.websocket_manager import manager
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to sockets of rooms that moved to another worker
+ROOM_MOVED_CODE = 4000
+# Set on the ASGI scope of requests that arrived over a worker's internal socket
+INTERNAL_SCOPE_KEY = "devsync_internal"
+# Response header marking a forwarded request refused because the receiver does not own the room
+NOT_OWNER_HEADER = b"x-devsync-not-owner"
+# A worker whose socket has not been touched for this many heartbeats is out of the ring
+STALE_HEARTBEATS = 3
+
+ROOM_ID = re.compile(r"[0-9a-f]{24}")
+ROOM_PATH = re.compile(r"^/(?:api/rooms|ws)/([0-9a-f]{24})(?:/|$)")
+# Not forwarded: per-connection framing and proxy headers of the incoming request
+HOP_BY_HOP_HEADERS = {
+    b"connection", b"keep-alive", b"transfer-encoding", b"upgrade", b"te", b"trailer",
+    b"proxy-authorization", b"proxy-authenticate", b"host", b"content-length",
+}
+
+ROOM_FORWARDS = counter(
+    "devsync_room_forwards_total", "Room requests proxied to the owning worker.", ("kind", "outcome"))
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes, so a membership change only moves
+    the rooms of the worker that joined or left."""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[i]
+
+
+class _InternalApp:
+    """Marks requests from other workers so they are never forwarded again."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            scope[INTERNAL_SCOPE_KEY] = True
+        await self.app(scope, receive, send)
+
+
+def _internal_server(app, path: str):
+    import uvicorn
+
+    class InternalServer(uvicorn.Server):
+        @contextlib.contextmanager
+        def capture_signals(self):
+            # The worker's own server handles signals and shuts this one down
+            yield
+
+    config = uvicorn.Config(_InternalApp(app), uds=path, lifespan="off", log_config=None, access_log=False)
+    return InternalServer(config)
+
+
+class RoomRouter:
+    """Tracks live workers and proxies room traffic to the worker that owns the room.
+
+    Disabled (every room is local) unless a routing directory is configured.
+    """
+
+    def __init__(self, directory: Optional[str], heartbeat: float, vnodes: int):
+        self.directory = directory
+        self.heartbeat = heartbeat
+        self.vnodes = vnodes
+        self.worker_id: Optional[str] = None
+        self.members: FrozenSet[str] = frozenset()
+        self.ring = HashRing((), vnodes)
+        # Workers that failed a forward, with their socket mtime at the time; skipped until they heartbeat again
+        self._suspect: Dict[str, float] = {}
+        self._clients: Dict[str, "httpx.AsyncClient"] = {}
+        self._server = None
+        self._server_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        # Refreshes come from the heartbeat loop and from forwarded requests; one at a time
+        self._refresh_lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.worker_id is not None
+
+    def socket_path(self, worker_id: str) -> str:
+        return os.path.join(self.directory, f"{worker_id}.sock")
+
+    def owner(self, room_id: str) -> Optional[str]:
+        """The worker that owns the room, or None when routing is off."""
+        return self.ring.owner(room_id) if self.enabled else None
+
+    def is_local(self, room_id: str) -> bool:
+        owner = self.owner(room_id)
+        return owner is None or owner == self.worker_id
+
+    def serves(self, room_id: str) -> bool:
+        """Whether room_registry may hold this room here. Keys that are not room ids always stay local."""
+        return ROOM_ID.fullmatch(room_id) is None or self.is_local(room_id)
+
+    # Membership
+
+    def _live_workers(self) -> FrozenSet[str]:
+        now = time.time()
+        live = {self.worker_id}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".sock"):
+                continue
+            worker_id = name[:-len(".sock")]
+            try:
+                mtime = os.stat(os.path.join(self.directory, name)).st_mtime
+            except FileNotFoundError:
+                continue
+            if now - mtime > STALE_HEARTBEATS * self.heartbeat:
+                continue
+            if mtime <= self._suspect.get(worker_id, float("-inf")):
+                continue
+            self._suspect.pop(worker_id, None)
+            live.add(worker_id)
+        return frozenset(live)
+
+    async def refresh(self):
+        """Heartbeat, then rebuild the ring if workers joined or left."""
+        async with self._refresh_lock:
+            await self._refresh()
+
+    async def _refresh(self):
+        os.utime(self.socket_path(self.worker_id))
+        members = self._live_workers()
+        if members == self.members:
+            if self._moved_rooms():
+                # A hand-off failed earlier; try it again
+                await self._rebalance()
+            return
+        left = self.members - members
+        logger.info("Worker %s sees %d live workers: %s", self.worker_id, len(members), ", ".join(sorted(members)))
+        for worker_id in left:
+            client = self._clients.pop(worker_id, None)
+            if client is not None:
+                await client.aclose()
+        await self._set_members(members)
+
+    async def _set_members(self, members: FrozenSet[str]):
+        """Rebuild the ring and hand off whatever it no longer assigns to this worker.
+
+        Every ring change goes through here, so a worker never keeps serving a
+        room that another worker now owns.
+        """
+        self.members = members
+        self.ring = HashRing(members, self.vnodes)
+        await self._rebalance()
+
+    async def claim(self, room_id: str) -> bool:
+        """Whether this worker owns the room, re-reading membership once before saying no.
+
+        Called for forwarded requests: the sender routed by its own view of the
+        ring, which may be newer than ours (a worker just joined) or older.
+        """
+        if self.is_local(room_id):
+            return True
+        await self.refresh()
+        return self.is_local(room_id)
+
+    def _moved_rooms(self) -> Set[str]:
+        """Rooms held or connected here that another worker owns."""
+        # Sockets keyed by something other than a room id (the dashboard's "notifications") stay put
+        room_ids = set(room_registry.rooms) | set(manager.active_connections)
+        return {room_id for room_id in room_ids if not self.serves(room_id)}
+
+    async def _rebalance(self):
+        """Hand off rooms this worker no longer owns: write them back, then close their sockets.
+
+        room_registry refuses edits to them as soon as the ring changes, and the
+        sockets only close once the write-back is done, so a client reconnecting
+        to the new owner never loads state older than its own edits.
+        """
+        for room_id in self._moved_rooms():
+            try:
+                await room_registry.hand_off(room_id)
+            except Exception:
+                # Its sockets stay open, with edits refused, until the retry on a later refresh succeeds
+                logger.exception("Failed to hand off room %s", room_id)
+                continue
+            for websocket in list(manager.active_connections.get(room_id, ())):
+                with contextlib.suppress(Exception):
+                    await websocket.close(code=ROOM_MOVED_CODE, reason="room moved")
+
+    async def _mark_suspect(self, worker_id: str):
+        """Drop an unreachable worker from the ring until its next heartbeat."""
+        with contextlib.suppress(FileNotFoundError):
+            self._suspect[worker_id] = os.stat(self.socket_path(worker_id)).st_mtime
+        logger.warning("Worker %s is unreachable; serving its rooms locally", worker_id)
+        await self._set_members(self.members - {worker_id})
+
+    # Forwarding
+
+    def _client(self, worker_id: str):
+        import httpx
+
+        client = self._clients.get(worker_id)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(uds=self.socket_path(worker_id))
+            client = httpx.AsyncClient(transport=transport, base_url="http://worker", timeout=None)
+            self._clients[worker_id] = client
+        return client
+
+    def _headers(self, scope) -> List[tuple]:
+        headers = [(k, v) for k, v in scope["headers"] if k.lower() not in HOP_BY_HOP_HEADERS]
+        headers.append((b"x-devsync-forwarded-by", self.worker_id.encode()))
+        return headers
+
+    @staticmethod
+    def _target(scope) -> str:
+        query = scope.get("query_string", b"").decode("latin-1")
+        return scope["path"] + (f"?{query}" if query else "")
+
+    async def forward_http(self, scope, body: bytes, send, owner: str) -> bool:
+        """Proxy an HTTP request to the owner. False if the owner could not be reached."""
+        import httpx
+
+        client = self._client(owner)
+        request = client.build_request(scope["method"], self._target(scope), headers=self._headers(scope), content=body)
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.TransportError:
+            ROOM_FORWARDS.inc("http", "unreachable")
+            await self._mark_suspect(owner)
+            return False
+        if NOT_OWNER_HEADER.decode() in response.headers:
+            # Our ring is out of date; catch up, and serve the request here if the room is ours now
+            await response.aclose()
+            ROOM_FORWARDS.inc("http", "not_owner")
+            await self.refresh()
+            if self.is_local(ROOM_PATH.match(scope["path"]).group(1)):
+                return False
+            await self.reject(scope, receive=None, send=send)
+            return True
+        try:
+            headers = [(k.lower(), v) for k, v in response.headers.raw if k.lower() not in HOP_BY_HOP_HEADERS]
+            if "content-length" in response.headers:
+                headers.append((b"content-length", response.headers["content-length"].encode()))
+            await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
+        ROOM_FORWARDS.inc("http", "ok")
+        return True
+
+    async def forward_websocket(self, scope, receive, send, owner: str) -> bool:
+        """Proxy a WebSocket to the owner, frame by frame. False if the owner could not be reached."""
+        from starlette.websockets import WebSocket, WebSocketDisconnect
+        from websockets.asyncio.client import unix_connect
+        from websockets.exceptions import ConnectionClosed, InvalidHandshake, InvalidStatus
+
+        try:
+            upstream = await unix_connect(
+                self.socket_path(owner), f"ws://worker{self._target(scope)}",
+                additional_headers=[("x-devsync-forwarded-by", self.worker_id)],
+                max_size=None, compression=None, open_timeout=self.heartbeat,
+            )
+        except InvalidStatus:
+            # The owner rejected the handshake; reject it here the same way
+            ROOM_FORWARDS.inc("websocket", "rejected")
+            await send({"type": "websocket.close", "code": 1008})
+            return True
+        except (OSError, asyncio.TimeoutError, InvalidHandshake):
+            ROOM_FORWARDS.inc("websocket", "unreachable")
+            await self._mark_suspect(owner)
+            return False
+
+        websocket = WebSocket(scope, receive, send)
+        await websocket.accept()
+        ROOM_FORWARDS.inc("websocket", "ok")
+
+        async def client_to_owner():
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                data = message.get("text")
+                await upstream.send(data if data is not None else message.get("bytes"))
+
+        async def owner_to_client():
+            with contextlib.suppress(ConnectionClosed):
+                async for data in upstream:
+                    if isinstance(data, str):
+                        await websocket.send_text(data)
+                    else:
+                        await websocket.send_bytes(data)
+
+        tasks = [asyncio.create_task(client_to_owner()), asyncio.create_task(owner_to_client())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await upstream.close()
+            # Pass the owner's close code on, so "room moved" reaches the client
+            with contextlib.suppress(RuntimeError, WebSocketDisconnect):
+                await websocket.close(code=upstream.close_code or 1000, reason=upstream.close_reason or "")
+        if upstream.close_code == ROOM_MOVED_CODE:
+            # The room moved or the owner refused it; have the ring current before the client reconnects
+            await self.refresh()
+        return True
+
+    @staticmethod
+    async def reject(scope, receive, send):
+        """Refuse room traffic this worker does not own, so the client retries and gets routed afresh."""
+        if scope["type"] == "websocket":
+            from starlette.websockets import WebSocket
+
+            # Accepted first so the close code reaches the client (a refused handshake has none)
+            websocket = WebSocket(scope, receive, send)
+            await websocket.accept()
+            await websocket.close(code=ROOM_MOVED_CODE, reason="room moved")
+            return
+        body = b'{"detail":"Room is moving to another worker, retry"}'
+        await send({"type": "http.response.start", "status": 503, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+            (b"retry-after", b"1"), (NOT_OWNER_HEADER, b"1"),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def discard(self, room_ids: Iterable[str]) -> Set[str]:
+        """Have each room's owner drop it from memory without writing it back.
+
+        Call this before deleting rooms' documents, or the owner's next
+        write-back recreates them. Returns the rooms whose owner could not be
+        reached; those must not be deleted yet.
+        """
+        by_owner: Dict[str, List[str]] = {}
+        for room_id in room_ids:
+            # Dropped here too, in case this worker still holds a copy from before the ring changed
+            await room_registry.discard(room_id)
+            owner = self.owner(room_id)
+            if owner is not None and owner != self.worker_id:
+                by_owner.setdefault(owner, []).append(room_id)
+        failed: Set[str] = set()
+        for owner, ids in by_owner.items():
+            try:
+                response = await self._client(owner).post("/internal/rooms/discard", json={"room_ids": ids})
+                response.raise_for_status()
+            except Exception:
+                logger.exception("Failed to discard rooms on worker %s", owner)
+                failed.update(ids)
+        return failed
+
+    async def members_changed(self, room_ids: Iterable[str]):
+        """Have the owners of these rooms reload their membership from Mongo.
+
+        Writes to shared_with made on a non-owning worker (bulk endpoints, join
+        approvals) are mirrored onto the owner's in-memory room this way.
+        """
+        by_owner: Dict[str, List[str]] = {}
+        for room_id in room_ids:
+            owner = self.owner(room_id)
+            if owner is not None and owner != self.worker_id:
+                by_owner.setdefault(owner, []).append(room_id)
+        for owner, ids in by_owner.items():
+            try:
+                await self._client(owner).post("/internal/rooms/reload", json={"room_ids": ids})
+            except Exception:
+                logger.exception("Failed to reload rooms on worker %s", owner)
+
+    # Lifecycle
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Room routing refresh failed")
+
+    async def start(self, app):
+        """Listen on this worker's socket and join the ring. No-op when routing is not configured."""
+        if self.directory is None or self.enabled:
+            return
+        worker_id = str(os.getpid())
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.socket_path(worker_id)
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+        self._server = _internal_server(app, path)
+        self._server_task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            if self._server_task.done():
+                self._server_task.result()
+                raise RuntimeError(f"Room routing listener did not start on {path}")
+            await asyncio.sleep(0.01)
+        self.worker_id = worker_id
+        room_registry.owns = self.serves
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Leave the ring. Other workers take over this worker's rooms on their next refresh."""
+        if not self.enabled:
+            return
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path(self.worker_id))
+        self._server.should_exit = True
+        await self._server_task
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        self.worker_id = None
+        self.members = frozenset()
+        self.ring = HashRing((), self.vnodes)
+
+
+class RoomAffinityMiddleware:
+    """ASGI middleware sending /api/rooms/{room_id}/... and /ws/{room_id} to the room's owning worker.
+
+    Requests from other workers are never forwarded again: they are served
+    here if this worker owns the room and refused otherwise, so two workers
+    never hold the same room. When the owner cannot be reached the request is
+    served locally.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        match = ROOM_PATH.match(scope["path"])
+        if scope.get(INTERNAL_SCOPE_KEY):
+            if match and not await room_router.claim(match.group(1)):
+                await room_router.reject(scope, receive, send)
+                return
+            await self.app(scope, receive, send)
+            return
+        owner = room_router.owner(match.group(1)) if match else None
+        if owner is None or owner == room_router.worker_id:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["type"] == "websocket":
+            if not await room_router.forward_websocket(scope, receive, send, owner):
+                await self.app(scope, receive, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        if await room_router.forward_http(scope, body, send, owner):
+            return
+
+        # Replay the consumed body to the local app
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+
+room_router = RoomRouter(ROOM_ROUTING_DIR, ROOM_ROUTING_HEARTBEAT, ROOM_ROUTING_VNODES)
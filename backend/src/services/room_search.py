@@ -0,0 +1,172 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from src.db.mongodb import db
+from src.services.room_files import entry_path
+from src.services.room_registry import room_registry
+
+SNIPPET_CHARS = 160
+KINDS = ("room", "code", "file", "chat")
+
+_TERM = re.compile(r"[^\W_]+")
+_SCORE = {"score": {"$meta": "textScore"}}
+_BY_SCORE = [("score", {"$meta": "textScore"})]
+
+
+def query_terms(query: str) -> List[str]:
+    """The words a search matches on, lowercased; negated words ("-foo") are left out."""
+    return [term.lower() for term in _TERM.findall(re.sub(r"(?:^|\s)-\S+", " ", query))]
+
+
+def _word_pattern(terms: List[str]) -> str:
+    """A regex matching any of the terms as a whole word, like the text index does."""
+    return r"(?<![^\W_])(?:%s)(?![^\W_])" % "|".join(map(re.escape, terms))
+
+
+def snippet(text: str, terms: List[str]) -> Tuple[str, Optional[int]]:
+    """The line around the first match of any term, trimmed to SNIPPET_CHARS, and its 1-based line number."""
+    match = re.search(_word_pattern(terms), text, re.IGNORECASE) if terms else None
+    if match is None:
+        return text[:SNIPPET_CHARS].strip(), None
+    start = text.rfind("\n", 0, match.start()) + 1
+    end = text.find("\n", match.end())
+    end = len(text) if end == -1 else end
+    # Center long lines on the match
+    start = max(start, match.start() - SNIPPET_CHARS // 2)
+    end = min(end, start + SNIPPET_CHARS)
+    line = text.count("\n", 0, match.start()) + 1
+    prefix = "..." if start > 0 and text[start - 1] != "\n" else ""
+    suffix = "..." if end < len(text) and text[end] != "\n" else ""
+    return prefix + text[start:end].strip() + suffix, line
+
+
+def _normalized(hits: List[dict]) -> List[dict]:
+    """Scores divided by the source's best one, since text scores from different indexes do not compare."""
+    top = max((hit["score"] for hit in hits), default=0)
+    for hit in hits:
+        hit["score"] = hit["score"] / top if top else 0.0
+    return hits
+
+
+class RoomSearch:
+    """Full-text search over room names, code, files and chat, scoped to rooms a user can access.
+
+    Backed by MongoDB text indexes, so the index is maintained by Mongo on the
+    same writes that persist rooms; edits held by the room registry become
+    searchable with the room's next flush. Indexes use no language, so code
+    keywords like "if" or "not" are not dropped as stop words and nothing is
+    stemmed. Each collection is queried for its best matches by text score;
+    the scores are scaled to each collection's best match, then the results
+    are merged and paged by offset.
+    """
+
+    async def ensure_indexes(self):
+        await db.rooms.create_index(
+            [("name", "text"), ("code", "text")], name="rooms_text",
+            weights={"name": 10, "code": 1}, default_language="none"
+        )
+        await db.room_files.create_index(
+            [("path", "text"), ("content", "text")], name="room_files_text",
+            weights={"path": 5, "content": 1}, default_language="none"
+        )
+        await db.chat_messages.create_index(
+            [("messages.text", "text")], name="chat_messages_text", default_language="none"
+        )
+
+    async def _rooms(self, uid: str) -> Dict[str, dict]:
+        """{room_id: {name, language}} for every room the user owns or was shared."""
+        cursor = db.rooms.find(
+            {"$or": [{"owner": uid}, {"shared_with": uid}]}, {"name": 1, "language": 1}
+        )
+        return {str(doc["_id"]): doc async for doc in cursor}
+
+    async def _room_hits(self, query: str, terms: List[str], uid: str, kinds, count: int) -> List[dict]:
+        """Rooms matching on name ("room" hits) or code ("code" hits)."""
+        match = {"$text": {"$search": query}, "$or": [{"owner": uid}, {"shared_with": uid}]}
+        # The text index covers both fields; when only one kind is wanted, filter in the query so the limit counts hits
+        if "room" not in kinds:
+            match["code"] = {"$regex": _word_pattern(terms), "$options": "i"}
+        elif "code" not in kinds:
+            match["name"] = {"$regex": _word_pattern(terms), "$options": "i"}
+        cursor = db.rooms.find(
+            match, {"name": 1, "code": 1, "language": 1, **_SCORE}
+        ).sort(_BY_SCORE).limit(count)
+        hits = []
+        async for doc in cursor:
+            room_id = str(doc["_id"])
+            hot = room_registry.get(room_id)
+            name = doc.get("name", "")
+            code = hot.code if hot else doc.get("code", "")
+            hit = {"room_id": room_id, "room_name": name, "score": doc["score"]}
+            text, line = snippet(code, terms)
+            # Unsaved edits may have removed the match from the hot copy; still a code hit if only code was asked for
+            if "code" in kinds and (line is not None or "room" not in kinds):
+                path = entry_path(doc.get("language", "python"))
+                hits.append({**hit, "kind": "code", "path": path, "line": line, "snippet": text})
+            else:
+                hits.append({**hit, "kind": "room", "snippet": name})
+        return hits
+
+    async def _file_hits(self, query: str, terms: List[str], rooms: Dict[str, dict], count: int) -> List[dict]:
+        cursor = db.room_files.find(
+            {"$text": {"$search": query}, "room_id": {"$in": list(rooms)}},
+            {"room_id": 1, "path": 1, "content": 1, **_SCORE}
+        ).sort(_BY_SCORE).limit(count)
+        hits = []
+        async for doc in cursor:
+            text, line = snippet(doc.get("content", ""), terms)
+            if line is None:
+                text = doc["path"]  # matched on the path
+            hits.append({
+                "room_id": doc["room_id"], "room_name": rooms[doc["room_id"]].get("name", ""),
+                "kind": "file", "path": doc["path"], "line": line, "snippet": text, "score": doc["score"],
+            })
+        return hits
+
+    async def _chat_hits(self, query: str, terms: List[str], rooms: Dict[str, dict], count: int) -> List[dict]:
+        """One hit per room: the newest message matching the most terms, and how many messages matched."""
+        cursor = db.chat_messages.find(
+            {"$text": {"$search": query}, "room_id": {"$in": list(rooms)}},
+            {"room_id": 1, "messages": 1, **_SCORE}
+        ).sort(_BY_SCORE).limit(count)
+        hits = []
+        async for doc in cursor:
+            best, best_hits, matched = None, 0, 0
+            for message in doc.get("messages", []):
+                words = {word.lower() for word in _TERM.findall(message.get("text", ""))}
+                found = sum(term in words for term in terms)
+                if found:
+                    matched += 1
+                if found and found >= best_hits:
+                    best, best_hits = message, found
+            if best is None:
+                continue
+            hits.append({
+                "room_id": doc["room_id"], "room_name": rooms[doc["room_id"]].get("name", ""),
+                "kind": "chat", "snippet": snippet(best.get("text", ""), terms)[0],
+                "user": best.get("user"), "timestamp": best.get("timestamp"), "matches": matched,
+                "score": doc["score"],
+            })
+        return hits
+
+    async def search(self, uid: str, query: str, kinds=KINDS, offset: int = 0, limit: int = 20):
+        """A page of hits ranked by score relative to their collection's best hit, and whether more follow it."""
+        terms = query_terms(query)
+        if not terms:
+            return [], False
+        # Every source contributes its best offset + limit + 1, enough to fill the page and tell if there is more
+        count = offset + limit + 1
+        hits: List[dict] = []
+        if "room" in kinds or "code" in kinds:
+            hits += _normalized(await self._room_hits(query, terms, uid, kinds, count))
+        if "file" in kinds or "chat" in kinds:
+            rooms = await self._rooms(uid)
+            if rooms and "file" in kinds:
+                hits += _normalized(await self._file_hits(query, terms, rooms, count))
+            if rooms and "chat" in kinds:
+                hits += _normalized(await self._chat_hits(query, terms, rooms, count))
+        hits.sort(key=lambda hit: hit["score"], reverse=True)
+        return hits[offset:offset + limit], len(hits) > offset + limit
+
+
+room_search = RoomSearch()
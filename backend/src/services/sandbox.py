@@ -0,0 +1,271 @@
+import asyncio
+import os
+import signal
+import uuid
+from typing import List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: only the wall-clock timeout and output cap apply
+    resource = None
+
+from src.core.config import (
+    EXECUTION_TIMEOUT, EXECUTION_CPU_SECONDS, EXECUTION_MEMORY_BYTES,
+    EXECUTION_MAX_PROCESSES, EXECUTION_MAX_OUTPUT_BYTES, EXECUTION_MAX_FILE_BYTES,
+    EXECUTION_CGROUP, EXECUTION_RLIMIT_NPROC,
+)
+
+READ_CHUNK = 64 * 1024
+
+# Values reported in a result's "limit_exceeded" field
+LIMIT_TIMEOUT = "timeout"
+LIMIT_CPU = "cpu"
+LIMIT_MEMORY = "memory"
+LIMIT_PROCESSES = "processes"
+LIMIT_OUTPUT = "output"
+LIMIT_FILE_SIZE = "file_size"
+
+
+class ResourceLimits:
+    """Per-run limits. None disables a limit."""
+
+    def __init__(
+        self,
+        timeout: float = EXECUTION_TIMEOUT,
+        cpu_seconds: Optional[int] = EXECUTION_CPU_SECONDS,
+        memory_bytes: Optional[int] = EXECUTION_MEMORY_BYTES,
+        max_processes: Optional[int] = EXECUTION_MAX_PROCESSES,
+        max_output_bytes: Optional[int] = EXECUTION_MAX_OUTPUT_BYTES,
+        max_file_bytes: Optional[int] = EXECUTION_MAX_FILE_BYTES,
+        limit_address_space: bool = True,
+    ):
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.max_processes = max_processes
+        self.max_output_bytes = max_output_bytes
+        self.max_file_bytes = max_file_bytes
+        # Runtimes that reserve large virtual ranges up front (V8) cannot run under
+        # RLIMIT_AS and must bound their heap another way
+        self.limit_address_space = limit_address_space
+
+
+class _Cgroup:
+    """A throwaway child of the delegated cgroup v2 directory in EXECUTION_CGROUP."""
+
+    def __init__(self, parent: str, limits: ResourceLimits):
+        self.path = os.path.join(parent, f"run-{uuid.uuid4().hex}")
+        os.mkdir(self.path)
+        if limits.memory_bytes:
+            self._write("memory.max", str(limits.memory_bytes))
+            self._write("memory.swap.max", "0")
+        self.limits_processes = bool(limits.max_processes) and self._write("pids.max", str(limits.max_processes))
+
+    def _write(self, name: str, value: str) -> bool:
+        try:
+            with open(os.path.join(self.path, name), "w") as f:
+                f.write(value)
+            return True
+        except OSError:
+            return False  # controller not enabled for this subtree
+
+    def _event_count(self, name: str, event: str) -> int:
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                for line in f:
+                    key, _, value = line.partition(" ")
+                    if key == event:
+                        return int(value)
+        except OSError:
+            pass
+        return 0
+
+    def enter(self):
+        """Called in the child between fork and exec."""
+        with open(os.path.join(self.path, "cgroup.procs"), "w") as f:
+            f.write(str(os.getpid()))
+
+    def limit_hit(self) -> Optional[str]:
+        if self._event_count("memory.events", "oom_kill"):
+            return LIMIT_MEMORY
+        if self._event_count("pids.events", "max"):
+            return LIMIT_PROCESSES
+        return None
+
+    def remove(self):
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass
+
+
+def _make_cgroup(limits: ResourceLimits) -> Optional[_Cgroup]:
+    if not EXECUTION_CGROUP:
+        return None
+    try:
+        return _Cgroup(EXECUTION_CGROUP, limits)
+    except OSError:
+        return None
+
+
+def _preexec(limits: ResourceLimits, cgroup: Optional[_Cgroup]):
+    def apply():
+        if cgroup:
+            cgroup.enter()
+        if resource is None:
+            return
+        if limits.cpu_seconds:
+            # SIGXCPU at the soft limit, SIGKILL one second later if it is ignored
+            resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + 1))
+        if limits.memory_bytes and limits.limit_address_space:
+            resource.setrlimit(resource.RLIMIT_AS, (limits.memory_bytes, limits.memory_bytes))
+        # pids.max counts only this run; RLIMIT_NPROC counts the whole user, so it is opt-in
+        use_nproc = EXECUTION_RLIMIT_NPROC and not (cgroup and cgroup.limits_processes)
+        if limits.max_processes and use_nproc and hasattr(resource, "RLIMIT_NPROC"):
+            resource.setrlimit(resource.RLIMIT_NPROC, (limits.max_processes, limits.max_processes))
+        if limits.max_file_bytes:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (limits.max_file_bytes, limits.max_file_bytes))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    return apply
+
+
+def _kill(process: asyncio.subprocess.Process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, AttributeError):
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+
+def _classify(returncode: int, stderr: str) -> Optional[str]:
+    """Best-effort guess at which rlimit stopped the program."""
+    if returncode == -getattr(signal, "SIGXCPU", 24):
+        return LIMIT_CPU
+    if returncode == -getattr(signal, "SIGXFSZ", 25):
+        return LIMIT_FILE_SIZE
+    if "MemoryError" in stderr or "bad_alloc" in stderr or "heap out of memory" in stderr:
+        return LIMIT_MEMORY
+    if "Resource temporarily unavailable" in stderr or "BlockingIOError" in stderr:
+        return LIMIT_PROCESSES
+    return None
+
+
+def _limit_message(limit: str, limits: ResourceLimits) -> str:
+    return {
+        LIMIT_TIMEOUT: f"Error: Code execution timed out ({limits.timeout:g} seconds limit)",
+        LIMIT_OUTPUT: f"Error: Output truncated after {limits.max_output_bytes} bytes",
+        LIMIT_CPU: f"Error: CPU time limit exceeded ({limits.cpu_seconds} seconds)",
+        LIMIT_MEMORY: "Error: Memory limit exceeded",
+        LIMIT_PROCESSES: "Error: Process limit exceeded",
+        LIMIT_FILE_SIZE: "Error: File size limit exceeded",
+    }[limit]
+
+
+async def run_sandboxed(
+    command: List[str],
+    cwd: str,
+    input_str: Optional[str] = None,
+    limits: Optional[ResourceLimits] = None,
+):
+    """Run a command under resource limits, streaming its output into a capped buffer.
+
+    Returns the usual {"stdout", "stderr", "returncode"} dict plus
+    "limit_exceeded" (None or one of the LIMIT_* names) and "truncated".
+    """
+    limits = limits or ResourceLimits()
+    cgroup = _make_cgroup(limits)
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE if input_str is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            start_new_session=True,
+            preexec_fn=_preexec(limits, cgroup) if os.name == "posix" else None,
+        )
+    except OSError as e:
+        # e.g. the executable vanished or is still open for writing (ETXTBSY)
+        if cgroup:
+            cgroup.remove()
+        return {
+            "stdout": "",
+            "stderr": f"Error: Could not start {os.path.basename(command[0])}: {e.strerror or e}",
+            "returncode": 1,
+            "limit_exceeded": None,
+            "truncated": False,
+        }
+
+    budget = {"remaining": limits.max_output_bytes, "truncated": False}
+    buffers = {"stdout": bytearray(), "stderr": bytearray()}
+
+    async def pump(stream: asyncio.StreamReader, name: str):
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                return
+            if budget["remaining"] is None:
+                buffers[name] += chunk
+                continue
+            if len(chunk) > budget["remaining"]:
+                buffers[name] += chunk[:budget["remaining"]]
+                budget["remaining"] = 0
+                budget["truncated"] = True
+                _kill(process)
+                return
+            buffers[name] += chunk
+            budget["remaining"] -= len(chunk)
+
+    async def feed():
+        if input_str is None:
+            return
+        try:
+            process.stdin.write(input_str.encode())
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            process.stdin.close()
+
+    limit_exceeded = None
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(feed(), pump(process.stdout, "stdout"), pump(process.stderr, "stderr"), process.wait()),
+            timeout=limits.timeout,
+        )
+    except asyncio.TimeoutError:
+        _kill(process)
+        await process.wait()
+        limit_exceeded = LIMIT_TIMEOUT
+    finally:
+        if process.returncode is None:
+            _kill(process)
+            await process.wait()
+
+    stdout = buffers["stdout"].decode(errors="replace")
+    stderr = buffers["stderr"].decode(errors="replace")
+    if budget["truncated"]:
+        limit_exceeded = LIMIT_OUTPUT
+    if limit_exceeded is None and cgroup:
+        limit_exceeded = cgroup.limit_hit()
+    if limit_exceeded is None:
+        limit_exceeded = _classify(process.returncode, stderr)
+    if cgroup:
+        cgroup.remove()
+
+    returncode = process.returncode
+    if limit_exceeded:
+        message = _limit_message(limit_exceeded, limits)
+        stderr = f"{stderr}\n{message}" if stderr else message
+        if returncode == 0 or limit_exceeded == LIMIT_TIMEOUT:
+            returncode = 1
+
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "returncode": returncode,
+        "limit_exceeded": limit_exceeded,
+        "truncated": budget["truncated"],
+    }
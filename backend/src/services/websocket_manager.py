@@ -1,18 +1,41 @@
-from typing import Dict, List
+from typing import Dict, List, Set
+import asyncio
 import json
+import logging
+import re
+import time
 from fastapi import WebSocket
 
+from src.core.firebase_admin import get_auth
+from src.core.metrics import gauge, WS_MESSAGES, BROADCAST_DURATION, BROADCAST_RECIPIENTS, FIREBASE_CALL_DURATION
+from src.core.tracing import span
+from src.services.notification_inbox import notification_inbox
+
+logger = logging.getLogger(__name__)
+
+# Frames are JSON objects whose first key is "type"; peeking avoids re-parsing large code frames
+_FRAME_TYPE = re.compile(r'\{\s*"type"\s*:\s*"([a-z_]{1,32})"')
+
+
+def frame_type(message: str) -> str:
+    match = _FRAME_TYPE.match(message)
+    return match.group(1) if match else "other"
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {}  # room_id -> [WebSocket]
         self.user_connections: Dict[str, List[WebSocket]] = {}    # user_uid -> [WebSocket]
         self.ws_to_user: Dict[WebSocket, str] = {}                # WebSocket -> user_uid
+        self.subscriptions: Dict[WebSocket, Set[str]] = {}        # WebSocket -> paths of open files
+        self._notify_tasks: Set[asyncio.Task] = set()
+
+    async def connect(self, websocket: WebSocket, room_id: str) -> dict:
+        """Accept the socket and authenticate it; returns the client's auth message.
 
-    async def connect(self, websocket: WebSocket, room_id: str):
+        The socket receives the room's broadcasts only after join(), once the
+        caller has captured the state it sends first.
+        """
         await websocket.accept()
-        if room_id not in self.active_connections:
-            self.active_connections[room_id] = []
-        self.active_connections[room_id].append(websocket)
         # Wait for auth message to get user_uid
         try:
             auth_data = await websocket.receive_text()
@@ -23,14 +46,24 @@ class ConnectionManager:
                 if user_uid not in self.user_connections:
                     self.user_connections[user_uid] = []
                 self.user_connections[user_uid].append(websocket)
+                if auth_msg.get('token'):
+                    await self._deliver_inbox(websocket, user_uid, auth_msg['token'])
+            return auth_msg
         except Exception:
             pass
+        return {}
+
+    def join(self, websocket: WebSocket, room_id: str):
+        """Start delivering the room's broadcasts to the socket."""
+        self.active_connections.setdefault(room_id, []).append(websocket)
 
     def disconnect(self, websocket: WebSocket, room_id: str):
-        if room_id in self.active_connections:
-            self.active_connections[room_id].remove(websocket)
-            if not self.active_connections[room_id]:
+        connections = self.active_connections.get(room_id)
+        if connections and websocket in connections:
+            connections.remove(websocket)
+            if not connections:
                 del self.active_connections[room_id]
+        self.subscriptions.pop(websocket, None)
         user_uid = self.ws_to_user.pop(websocket, None)
         if user_uid and user_uid in self.user_connections:
             self.user_connections[user_uid].remove(websocket)
@@ -39,19 +72,99 @@ class ConnectionManager:
 
     async def broadcast_to_room(self, message: str, room_id: str, sender: WebSocket = None):
         if room_id in self.active_connections:
+            recipients = [c for c in self.active_connections[room_id] if c != sender]
+            await self._fan_out(message, room_id, recipients)
+
+    def subscribe(self, websocket: WebSocket, paths: Set[str]):
+        """Set the files a socket has open; it then only receives edits to those files."""
+        self.subscriptions[websocket] = set(paths)
+
+    async def broadcast_to_file(self, message: str, room_id: str, path: str, sender: WebSocket = None,
+                                unsubscribed: bool = False):
+        """Send an edit of one file to the room's sockets that have it open.
+
+        With unsubscribed, sockets that never sent a subscription (clients that
+        only know the entry file) receive it too.
+        """
+        if room_id in self.active_connections:
+            recipients = []
             for connection in self.active_connections[room_id]:
-                if connection != sender:
-                    try:
-                        await connection.send_text(message)
-                    except:
+                if connection == sender:
+                    continue
+                paths = self.subscriptions.get(connection)
+                if (paths is None and unsubscribed) or (paths is not None and path in paths):
+                    recipients.append(connection)
+            await self._fan_out(message, room_id, recipients)
+
+    async def _fan_out(self, message: str, room_id: str, recipients: List[WebSocket]):
+        start = time.perf_counter()
+        sent = 0
+        with span("broadcast"):
+            for connection in recipients:
+                try:
+                    await connection.send_text(message)
+                    sent += 1
+                except:
+                    if connection in self.active_connections.get(room_id, []):
                         self.active_connections[room_id].remove(connection)
+        BROADCAST_DURATION.observe(time.perf_counter() - start)
+        BROADCAST_RECIPIENTS.inc(amount=sent)
+        WS_MESSAGES.inc("out", frame_type(message), amount=sent)
 
     async def send_notification_to_user(self, user_uid: str, message: str):
         if user_uid in self.user_connections:
             for ws in self.user_connections[user_uid]:
                 try:
                     await ws.send_text(message)
+                    WS_MESSAGES.inc("out", "notification")
                 except:
                     pass
 
-manager = ConnectionManager() 
\ No newline at end of file
+    async def _deliver_inbox(self, websocket: WebSocket, user_uid: str, token: str):
+        """Send everything left in the user's inbox as one frame. Requires a valid ID token for user_uid."""
+        try:
+            with FIREBASE_CALL_DURATION.time("verify_id_token"):
+                # Blocking (it may fetch Google's signing keys), so it runs in a thread
+                verified_uid = (await asyncio.to_thread(get_auth().verify_id_token, token))["uid"]
+        except Exception:
+            return
+        if verified_uid != user_uid:
+            return
+        try:
+            items, more = await notification_inbox.pending(user_uid)
+            if items:
+                await websocket.send_text(json.dumps({
+                    "type": "notifications", "items": items, "cursor": items[-1]["seq"], "more": more
+                }))
+                WS_MESSAGES.inc("out", "notifications")
+        except Exception:
+            logger.exception("Failed to deliver notification inbox to %s", user_uid)
+
+    def notify(self, user_uid: str, payload: dict):
+        """Record a notification in the user's inbox and push it to their open sockets.
+
+        Returns immediately; the write and the push happen in a background task.
+        """
+        task = asyncio.create_task(self._record_and_send(user_uid, payload))
+        self._notify_tasks.add(task)
+        task.add_done_callback(self._notify_tasks.discard)
+
+    async def _record_and_send(self, user_uid: str, payload: dict):
+        try:
+            payload["seq"] = await notification_inbox.record(user_uid, payload)
+        except Exception:
+            # Still worth delivering live; it just won't be there on the next connect
+            logger.exception("Failed to store notification for %s", user_uid)
+        await self.send_notification_to_user(user_uid, json.dumps(payload))
+
+    async def drain_notifications(self):
+        """Wait for in-flight notify() writes, e.g. before shutdown."""
+        if self._notify_tasks:
+            await asyncio.gather(*self._notify_tasks, return_exceptions=True)
+
+manager = ConnectionManager()
+
+gauge(
+    "devsync_websocket_connections", "Open WebSocket connections per room.", ("room",),
+    collect=lambda: [((room_id,), len(sockets)) for room_id, sockets in list(manager.active_connections.items())]
+) 
\ No newline at end of file
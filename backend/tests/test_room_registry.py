@@ -0,0 +1,103 @@
+"""Room registry write-back, run against the in-memory stand-ins.
+
+    python -m pytest tests
+
+Run from the backend directory.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+
+from benchmarks import standins
+
+database = standins.install()
+
+from src.services.room_registry import room_registry  # noqa: E402
+
+
+async def _new_room() -> str:
+    result = await database.rooms.insert_one({"name": "chat only", "owner": "alice", "language": "python", "code": ""})
+    return str(result.inserted_id)
+
+
+def test_chat_only_room_keeps_its_version_across_hibernate():
+    async def scenario():
+        room_id = await _new_room()
+        room = await room_registry.acquire(room_id)
+        for text in ("one", "two", "three"):
+            room_registry.add_chat(room, {"type": "chat_message", "user": "alice", "text": text})
+        assert room.version == 3
+
+        await room_registry.hibernate(room_id)
+        assert room_registry.get(room_id) is None
+        assert (await database.rooms.find_one({"_id": ObjectId(room_id)}))["version"] == 3
+
+        room = await room_registry.acquire(room_id)
+        assert room.version == 3
+        assert [m["version"] for m in room.chat] == [1, 2, 3]
+        assert room_registry.add_chat(room, {"type": "chat_message", "user": "alice", "text": "four"}) == 4
+        await room_registry.discard(room_id)
+
+    asyncio.run(scenario())
+
+
+def test_cleared_chat_keeps_its_version_across_hibernate():
+    async def scenario():
+        room_id = await _new_room()
+        room = await room_registry.acquire(room_id)
+        room_registry.add_chat(room, {"type": "chat_message", "user": "alice", "text": "one"})
+        await room_registry.clear_chat(room)
+
+        await room_registry.hibernate(room_id)
+        room = await room_registry.acquire(room_id)
+        assert room.version == 2
+        assert list(room.chat) == []
+        await room_registry.discard(room_id)
+
+    asyncio.run(scenario())
+
+
+def test_moved_room_is_written_back_before_its_sockets_close():
+    from src.services.room_registry import RoomMoved
+    from src.services.room_router import ROOM_MOVED_CODE, room_router
+    from src.services.websocket_manager import manager
+
+    async def scenario():
+        room_id = await _new_room()
+        room = await room_registry.acquire(room_id)
+        room_registry.update_code(room, {"type": "code_update", "code": "print('latest')"})
+        closed = []
+
+        class Socket:
+            async def close(self, code, reason=""):
+                doc = await database.rooms.find_one({"_id": ObjectId(room_id)})
+                closed.append((code, doc.get("code")))
+
+        manager.active_connections[room_id] = [Socket()]
+        # The ring now assigns the room to another worker
+        room_router.is_local = lambda other: other != room_id
+        room_registry.owns = room_router.serves
+        try:
+            try:
+                room_registry.update_code(room, {"type": "code_update", "code": "refused"})
+                assert False, "edited a room owned by another worker"
+            except RoomMoved:
+                pass
+            await room_router._rebalance()
+            assert closed == [(ROOM_MOVED_CODE, "print('latest')")]
+            assert room_registry.get(room_id) is None
+            try:
+                await room_registry.acquire(room_id)
+                assert False, "acquire loaded a room owned by another worker"
+            except RoomMoved:
+                pass
+        finally:
+            del room_router.is_local
+            room_registry.owns = lambda other: True
+            manager.active_connections.pop(room_id, None)
+
+    asyncio.run(scenario())
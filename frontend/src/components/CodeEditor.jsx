@@ -2,7 +2,7 @@ import { useState, useEffect, useRef } from 'react'
 import { Editor } from '@monaco-editor/react'
 import { Button } from '@/components/ui/button.jsx'
 import { Badge } from '@/components/ui/badge.jsx'
-import { Play, Copy, Users, Check, Terminal, Download, Upload, ChevronLeft, ChevronRight, Plus, X, MessageCircle } from 'lucide-react'
+import { Play, Copy, Users, Check, Terminal, Download, Upload, ChevronLeft, ChevronRight, Plus, X, MessageCircle, FileCode } from 'lucide-react'
 import api from '@/lib/axios'
 import { Popover, PopoverContent, PopoverTrigger } from '@/components/ui/popover'
 import { useFirebaseAuth } from '@/hooks/useFirebaseAuth'
@@ -17,6 +17,13 @@ import { Tooltip } from '@/components/ui/tooltip'
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || '';
 const WS_BASE_URL = import.meta.env.VITE_WS_BASE_URL || '';
+// Close code the backend uses when a room is handed to another worker process
+const ROOM_MOVED_CODE = 4000;
+// Frames whose version is the room's event version, which reconnects report as last_version
+const ROOM_VERSIONED_TYPES = new Set(['code_update', 'chat_message', 'catch_up', 'room_snapshot', 'chat_history']);
+// Monaco language ids by file extension
+const EDITOR_LANGUAGES = { py: 'python', js: 'javascript', c: 'c', h: 'cpp', cpp: 'cpp', cc: 'cpp', cxx: 'cpp', hpp: 'cpp', json: 'json', md: 'markdown' };
+const editorLanguage = (path) => EDITOR_LANGUAGES[path.split('.').pop()] || 'plaintext';
 
 function CodeEditor({ room }) {
   const { user } = useFirebaseAuth();
@@ -29,8 +36,11 @@ function CodeEditor({ room }) {
   const [membersLoading, setMembersLoading] = useState(true)
   const wsRef = useRef(null)
   const editorRef = useRef(null)
+  const monacoRef = useRef(null)
+  const diagnosticsRef = useRef({})
   const retryCountRef = useRef(0)
   const retryDelayRef = useRef(3000)
+  const lastVersionRef = useRef(null)
   const maxRetries = 8
   const maxDelay = 30000
   const [cpMode, setCpMode] = useState(() => {
@@ -57,12 +67,21 @@ function CodeEditor({ room }) {
   const [unreadChat, setUnreadChat] = useState(false);
   const chatEndRef = useRef(null);
   const isOwner = user?.uid === room.owner;
+  // The entry file is the room's code; other files are loaded only when opened
+  const entryPath = room.entry_file || 'main.py'
+  const [files, setFiles] = useState([{ path: entryPath, entry: true }])
+  const [activePath, setActivePath] = useState(entryPath)
+  const [fileContents, setFileContents] = useState({})
+  const activePathRef = useRef(entryPath)
+  const isEntryActive = activePath === entryPath
 
   useEffect(() => {
     retryCountRef.current = 0
     retryDelayRef.current = 3000
+    lastVersionRef.current = null
     connectWebSocket()
     fetchMembers()
+    fetchFiles()
     return () => {
       if (wsRef.current) {
         wsRef.current.close()
@@ -83,6 +102,44 @@ function CodeEditor({ room }) {
     }
   }
 
+  const fetchFiles = async () => {
+    try {
+      const response = await api.get(`/api/rooms/${room._id}/files`)
+      setFiles(response.data.files)
+    } catch {}
+  }
+
+  // Only the active file is subscribed, so edits to other files are not sent to this client
+  const subscribeToActiveFile = (ws = wsRef.current) => {
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify({ type: 'subscribe', paths: [activePathRef.current] }))
+    }
+  }
+
+  // Diagnostics are kept per path and applied once the file's model exists (Monaco creates it when the file is opened)
+  const applyDiagnostics = (path) => {
+    const monaco = monacoRef.current
+    const model = monaco && monaco.editor.getModel(monaco.Uri.parse(path))
+    if (!model) return
+    const severities = { error: monaco.MarkerSeverity.Error, warning: monaco.MarkerSeverity.Warning }
+    monaco.editor.setModelMarkers(model, 'devsync', (diagnosticsRef.current[path] || []).map(d => ({
+      startLineNumber: d.line,
+      startColumn: d.column,
+      endLineNumber: d.end_line,
+      endColumn: Math.max(d.end_column, d.column + 1),
+      severity: severities[d.severity] ?? monaco.MarkerSeverity.Info,
+      message: d.message,
+      code: d.code,
+    })))
+  }
+
+  useEffect(() => {
+    activePathRef.current = activePath
+    subscribeToActiveFile()
+    applyDiagnostics(activePath)
+    // eslint-disable-next-line
+  }, [activePath])
+
   const connectWebSocket = () => {
     try {
       const ws = new WebSocket(`${WS_BASE_URL}/ws/${room._id}`)
@@ -90,18 +147,47 @@ function CodeEditor({ room }) {
         retryCountRef.current = 0
         retryDelayRef.current = 3000
         if (user?.uid) {
-          ws.send(JSON.stringify({ type: 'auth', user_uid: user.uid }))
+          // On reconnect, report the last seen version so the server only sends what we missed
+          ws.send(JSON.stringify({ type: 'auth', user_uid: user.uid, last_version: lastVersionRef.current }))
+          subscribeToActiveFile(ws)
         }
       }
-      ws.onmessage = (event) => {
-        const message = JSON.parse(event.data)
-        if (message.type === 'notification' && message.subtype === 'room_shared') {
+      const handleMessage = (message) => {
+        // Only room-level frames carry the room's event version; file frames count per file
+        if (ROOM_VERSIONED_TYPES.has(message.type) && typeof message.version === 'number' && message.version > (lastVersionRef.current ?? -1)) {
+          lastVersionRef.current = message.version
+        }
+        if (message.type === 'catch_up') {
+          (message.events || []).forEach(handleMessage)
+        } else if (message.type === 'room_snapshot') {
+          setCode(message.code || '')
+          setChatMessages(message.messages || [])
+        } else if (message.type === 'notification' && message.subtype === 'room_shared') {
           toast.info(message.message)
         } else if (message.type === 'notification' && message.subtype === 'removed_from_room') {
+          // Bulk removals list every affected room; only leave if this one is among them
+          if (Array.isArray(message.room_ids) && !message.room_ids.includes(room._id)) {
+            toast.info(message.message)
+            return
+          }
           toast.error(message.message)
           setTimeout(() => {
             navigate('/app')
           }, 2000)
+        } else if (message.type === 'file_content' || message.type === 'file_update') {
+          if (message.path === entryPath) {
+            setCode(message.content)
+          } else {
+            setFileContents(prev => ({ ...prev, [message.path]: message.content }))
+          }
+        } else if (message.type === 'files_changed') {
+          setFiles(message.files || [])
+          if (!(message.files || []).some(f => f.path === activePathRef.current)) {
+            setActivePath(entryPath)
+          }
+        } else if (message.type === 'diagnostics') {
+          diagnosticsRef.current[message.path] = message.diagnostics || []
+          applyDiagnostics(message.path)
         } else if (message.type === 'code_update') {
           setCode(message.code)
         } else if (message.type === 'execution_result') {
@@ -128,7 +214,15 @@ function CodeEditor({ room }) {
           if (!chatOpen) setUnreadChat(true);
         }
       }
-      ws.onclose = () => {
+      ws.onmessage = (event) => {
+        handleMessage(JSON.parse(event.data))
+      }
+      ws.onclose = (event) => {
+        if (event.code === ROOM_MOVED_CODE) {
+          // The room moved to another server worker; reconnect right away and catch up from lastVersionRef
+          setTimeout(connectWebSocket, 100)
+          return
+        }
         if (retryCountRef.current < maxRetries) {
           const delay = retryDelayRef.current
           setTimeout(connectWebSocket, delay)
@@ -144,6 +238,13 @@ function CodeEditor({ room }) {
   }
 
   const handleEditorChange = (value) => {
+    if (!isEntryActive) {
+      setFileContents(prev => ({ ...prev, [activePath]: value || '' }))
+      if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+        wsRef.current.send(JSON.stringify({ type: 'file_update', path: activePath, content: value || '' }))
+      }
+      return
+    }
     setCode(value || '')
     if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
       wsRef.current.send(JSON.stringify({
@@ -154,19 +255,21 @@ function CodeEditor({ room }) {
   }
 
   const executeCode = async () => {
-    if (!code.trim()) return;
+    if (isEntryActive && !code.trim()) return;
     setIsExecuting(true);
     setOutput('Executing...');
+    // Away from the entry file this client no longer receives its edits, so let the server run its own copy
+    const entryCode = isEntryActive ? code : undefined;
     try {
       let response;
       if (cpMode) {
         response = await api.post(`/api/rooms/${room._id}/execute`, {
-          code,
+          code: entryCode,
           inputs: testCases.map(tc => tc.input)
         });
       } else {
         response = await api.post(`/api/rooms/${room._id}/execute`, {
-          code,
+          code: entryCode,
           inputs: simpleInput ? [simpleInput] : undefined
         });
       }
@@ -222,8 +325,10 @@ function CodeEditor({ room }) {
 
   const handleEditorDidMount = (editor, monaco) => {
     editorRef.current = editor
+    monacoRef.current = monaco
+    applyDiagnostics(activePathRef.current)
     
-    monaco.editor.setModelLanguage(editor.getModel(), 'python')
+    monaco.editor.setModelLanguage(editor.getModel(), editorLanguage(activePathRef.current))
     
     editor.updateOptions({
       fontSize: 15,
@@ -394,6 +499,30 @@ function CodeEditor({ room }) {
     reader.readAsText(file);
   };
 
+  const handleNewFile = async () => {
+    const path = window.prompt('New file path (e.g. utils.py or lib/helpers.py)')
+    if (!path || !path.trim()) return
+    try {
+      const response = await api.put(`/api/rooms/${room._id}/files/${path.trim()}`, { content: '' })
+      setFileContents(prev => ({ ...prev, [response.data.path]: '' }))
+      await fetchFiles()
+      setActivePath(response.data.path)
+    } catch (error) {
+      toast.error(error.response?.data?.detail || 'Could not create file')
+    }
+  }
+
+  const handleDeleteFile = async (path) => {
+    if (!window.confirm(`Delete ${path}?`)) return
+    try {
+      await api.delete(`/api/rooms/${room._id}/files/${path}`)
+      setFiles(prev => prev.filter(f => f.path !== path))
+      if (activePath === path) setActivePath(entryPath)
+    } catch (error) {
+      toast.error(error.response?.data?.detail || 'Could not delete file')
+    }
+  }
+
   // Scroll chat to bottom when opened or new message
   useEffect(() => {
     if (chatOpen && chatEndRef.current) {
@@ -524,11 +653,35 @@ function CodeEditor({ room }) {
         {/* Editor and Output Panel (Resizable/Collapsible) */}
         <ResizablePanelGroup direction="horizontal" className="flex-1 min-h-0 relative">
           <ResizablePanel defaultSize={outputPanelOpen ? 60 : 100} minSize={30} maxSize={100}>
-            <div className="flex-1 bg-zinc-950/90 h-full">
+            <div className="flex-1 bg-zinc-950/90 h-full flex">
+              {/* File tree: paths are shown flat, folders as path prefixes */}
+              <div className="w-48 shrink-0 border-r border-zinc-800 bg-zinc-900/60 overflow-y-auto text-sm">
+                <div className="flex items-center justify-between px-3 py-2 text-xs uppercase tracking-wide text-zinc-400">
+                  Files
+                  <Tooltip content="New File"><button onClick={handleNewFile} className="hover:text-zinc-100"><Plus className="h-4 w-4" /></button></Tooltip>
+                </div>
+                {files.map(file => (
+                  <div
+                    key={file.path}
+                    onClick={() => setActivePath(file.path)}
+                    className={`group flex items-center gap-2 px-3 py-1 cursor-pointer truncate ${file.path === activePath ? 'bg-zinc-800 text-zinc-100' : 'text-zinc-400 hover:bg-zinc-800/60'}`}
+                  >
+                    <FileCode className="h-4 w-4 shrink-0" />
+                    <span className="truncate flex-1" title={file.path}>{file.path}</span>
+                    {!file.entry && (
+                      <button onClick={(e) => { e.stopPropagation(); handleDeleteFile(file.path) }} className="opacity-0 group-hover:opacity-100 hover:text-red-400">
+                        <X className="h-3 w-3" />
+                      </button>
+                    )}
+                  </div>
+                ))}
+              </div>
+              <div className="flex-1 min-w-0 h-full">
               <Editor
                 height="100%"
-                defaultLanguage="python"
-                value={code}
+                path={activePath}
+                language={editorLanguage(activePath)}
+                value={isEntryActive ? code : (fileContents[activePath] ?? '')}
                 onChange={handleEditorChange}
                 onMount={handleEditorDidMount}
                 options={{
@@ -544,6 +697,7 @@ function CodeEditor({ room }) {
                   lineNumbers: 'on',
                 }}
               />
+              </div>
             </div>
           </ResizablePanel>
           {outputPanelOpen && (
@@ -35,6 +35,7 @@ export default function DashboardLayout({ children }) {
   const shownActionToastIds = useRef(new Set(JSON.parse(localStorage.getItem('shownActionToastIds') || '[]')));
   const [notifications, setNotifications] = useState([]);
   const wsRef = useRef(null);
+  const notificationCursorRef = useRef(0);
   const [actionDialogOpen, setActionDialogOpen] = useState(false);
   const [actionDialogMessage, setActionDialogMessage] = useState('');
 
@@ -49,12 +50,6 @@ export default function DashboardLayout({ children }) {
     }
   };
 
-  useEffect(() => {
-    fetchPendingRequests();
-    const interval = setInterval(fetchPendingRequests, 30000); // Poll every 30 seconds
-    return () => clearInterval(interval);
-  }, [user]);
-
   useEffect(() => {
     const fetchRecentRooms = async () => {
       if (user) {
@@ -82,25 +77,25 @@ export default function DashboardLayout({ children }) {
     return () => window.removeEventListener('storage', fetchRecentRooms);
   }, [user]);
 
-  useEffect(() => {
+  const fetchRequests = async () => {
     if (!user) return;
-    const fetchData = async () => {
-      try {
-        const [pending, my] = await Promise.all([
-          api.get('/api/requests/pending'),
-          api.get('/api/requests/my')
-        ]);
-        setPendingRequests(Array.isArray(pending.data) ? pending.data : []);
-        setMyRequests(Array.isArray(my.data) ? my.data : []);
-      } catch (error) {
-        console.error("Failed to fetch requests:", error);
-        setPendingRequests([]);
-        setMyRequests([]);
-      }
-    };
-    fetchData();
-    const interval = setInterval(fetchData, 10000);
-    return () => clearInterval(interval);
+    try {
+      const [pending, my] = await Promise.all([
+        api.get('/api/requests/pending'),
+        api.get('/api/requests/my')
+      ]);
+      setPendingRequests(Array.isArray(pending.data) ? pending.data : []);
+      setMyRequests(Array.isArray(my.data) ? my.data : []);
+    } catch (error) {
+      console.error("Failed to fetch requests:", error);
+      setPendingRequests([]);
+      setMyRequests([]);
+    }
+  };
+
+  // Loaded once; join request changes arrive as notifications, which trigger a refresh
+  useEffect(() => {
+    fetchRequests();
   }, [user]);
 
   useEffect(() => {
@@ -252,20 +247,48 @@ export default function DashboardLayout({ children }) {
       : myRequests.length
   );
 
-  // Real-time WebSocket notifications only
+  // Notifications: the server keeps an inbox per user and, once the socket authenticates
+  // with an ID token, sends everything unread in one "notifications" frame
+  const addNotifications = (items) => {
+    if (!items.length) return;
+    items.forEach(item => {
+      if (typeof item.seq === 'number') {
+        notificationCursorRef.current = Math.max(notificationCursorRef.current, item.seq);
+      }
+    });
+    setNotifications((prev) => {
+      const known = new Set(prev.map(n => n.seq).filter(seq => seq !== undefined));
+      const fresh = items.filter(item => item.seq === undefined || !known.has(item.seq));
+      return [...fresh.reverse(), ...prev];
+    });
+    if (items.some(item => item.subtype?.startsWith('join_request'))) {
+      fetchRequests();
+    }
+  };
+
   useEffect(() => {
     if (!user) return;
     const wsUrl = `${import.meta.env.VITE_WS_BASE_URL}/ws/notifications`;
     const ws = new WebSocket(wsUrl);
-    ws.onopen = () => {
+    ws.onopen = async () => {
       if (user?.uid) {
-        ws.send(JSON.stringify({ type: 'auth', user_uid: user.uid }));
+        const token = await user.getIdToken();
+        ws.send(JSON.stringify({ type: 'auth', user_uid: user.uid, token }));
       }
     };
-    ws.onmessage = (event) => {
+    ws.onmessage = async (event) => {
       const message = JSON.parse(event.data);
       if (message.type === 'notification') {
-        setNotifications((prev) => [message, ...prev]);
+        addNotifications([message]);
+      } else if (message.type === 'notifications') {
+        addNotifications(message.items || []);
+        // Page through the rest of a large inbox
+        let { cursor, more } = message;
+        while (more) {
+          const response = await api.get('/api/notifications', { params: { after: cursor } });
+          addNotifications(response.data.items);
+          ({ cursor, more } = response.data);
+        }
       }
     };
     ws.onerror = (error) => {
@@ -280,6 +303,17 @@ export default function DashboardLayout({ children }) {
     };
   }, [user]);
 
+  const handleClearNotifications = async () => {
+    setNotifications([]);
+    if (notificationCursorRef.current > 0) {
+      try {
+        await api.post('/api/notifications/ack', { cursor: notificationCursorRef.current });
+      } catch (error) {
+        console.error("Failed to acknowledge notifications:", error);
+      }
+    }
+  };
+
   const handleApproveRequest = async (notif, idx) => {
     try {
       await api.post(`/api/requests/${notif.request_id}/approve`);
@@ -457,7 +491,7 @@ export default function DashboardLayout({ children }) {
                 ) : (
                   <p className="text-sm text-zinc-400 text-center py-4">No notifications.</p>
                 )}
-                <Button variant="ghost" size="sm" onClick={() => setNotifications([])} className="w-full mt-2">
+                <Button variant="ghost" size="sm" onClick={handleClearNotifications} className="w-full mt-2">
                   Clear All
                 </Button>
               </PopoverContent>